@@ -0,0 +1 @@
+# performance benchmarks of the honeybees pipeline and page compute paths, run with python -m benchmarks.run
@@ -0,0 +1,210 @@
+# load test of the app: many simulated sessions walk through every page and widget path, several of them alive at
+# once in every worker process and sharing its caches and dataset as real sessions do, and the latency
+# percentiles of every interaction and the peak memory of the workers are recorded as json, e.g.
+#   python -m benchmarks.loadtest --sessions 50 --concurrency 8 --workers 2
+# it needs the streamlit of requirements-dev.txt, as AppTest came after the one the app is deployed with.
+# streamlit's AppTest swaps process-wide state on every rerun, so the sessions of a worker take turns running
+# their interactions rather than running them on threads, as the reruns of one server process share its GIL.
+# AppTest polls for the end of a rerun every 100 ms, so the time of the rerun itself is read from the timing log
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.run import RESULT_DIR, environment
+from honeybees import instrument
+
+APP_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "honey-bees-app.py")
+PAGES = ["What's the buzz?", "The swarm of issues", "The efforts beeing made", "More about the data"]
+PERCENTILES = [50, 95, 99]
+
+
+def widget(widgets, label):
+    # first widget of a kind with the given label
+    return next(w for w in widgets if w.label == label)
+
+
+def pageSteps(page, rng):
+    # (name, action) interactions of a session on one page, with randomly picked values; every widget the page
+    # has is used, the options shown behind checkboxes included
+    states = ["California", "Texas", "Hawaii", "Florida", "Iowa", "North Dakota"]
+    if page == "The swarm of issues":
+        return [("stressor", lambda at: widget(at.selectbox, "Select stressor").set_value(
+                    rng.choice(["varroa mites", "diseases", "pesticides", "unknown"]))),
+                ("state", lambda at: widget(at.selectbox, "Select state").set_value(rng.choice(states))),
+                ("state averages", lambda at: widget(at.checkbox, "View state averages for stressors").check()),
+                ("test results", lambda at: widget(at.checkbox,
+                                                   "View source data and test results from analysis").check()),
+                ("test grouping", lambda at: widget(at.selectbox, "Group by").set_value(
+                    rng.choice(["quarter", "region"])))]
+    if page == "The efforts beeing made":
+        return [("state", lambda at: widget(at.selectbox, "Select state").set_value(rng.choice(states))),
+                ("all states", lambda at: widget(at.checkbox, "View percentages for all states").check()),
+                ("share grouping", lambda at: widget(at.selectbox, "Group percentages by").set_value(
+                    rng.choice(["state", "region", "quarter"]))),
+                ("custom range", lambda at: widget(at.radio, "Select time frame").set_value("custom range")),
+                ("time frame", lambda at: widget(at.select_slider, "Pick a time frame").set_range(
+                    rng.choice(["2015Q1", "2016Q1"]), rng.choice(["2019Q4", "2020Q4"])))]
+    if page == "More about the data":
+        # the viewer is paged before it is filtered, as a narrow selection fits on one page and has no page picker
+        return [("variable", lambda at: widget(at.selectbox, "Select variable").set_value(
+                    rng.choice(["varroa mites", "lost", "end count"]))),
+                ("line states", lambda at: widget(at.multiselect, "Select state(s)").set_value(
+                    rng.sample(states, rng.randint(1, 3)))),
+                ("region filter", lambda at: widget(at.selectbox, "Filter location by").set_value("region")),
+                ("line region", lambda at: widget(at.selectbox, "Select state(s)").set_value(
+                    rng.choice(["South", "West", "Northeast", "Midwest"]))),
+                ("example state", lambda at: widget(at.selectbox, "Select state").set_value(rng.choice(states))),
+                ("data category", lambda at: widget(at.selectbox, "Select category of data").set_value(
+                    rng.choice(["stressors", "counts"]))),
+                ("raw data", lambda at: widget(at.checkbox, "View raw data").check()),
+                ("viewer page", lambda at: at.number_input(key="viewer page").set_value(2)),
+                ("viewer states", lambda at: at.multiselect(key="viewer states").set_value(
+                    rng.sample(states, rng.randint(1, 3)))),
+                ("viewer region", lambda at: at.selectbox(key="viewer region").set_value(
+                    rng.choice(["all regions", "South", "West"]))),
+                ("viewer periods", lambda at: at.select_slider(key="viewer periods").set_range(
+                    rng.choice(["2015Q1", "2016Q1"]), rng.choice(["2019Q4", "2020Q4"]))),
+                ("download", lambda at: widget(at.checkbox, "Download the selected rows").check()),
+                ("download data", lambda at: at.radio(key="viewer frame").set_value(
+                    rng.choice(["after interpolation", "before interpolation"]))),
+                ("download format", lambda at: at.radio(key="viewer format").set_value(rng.choice(["csv", "parquet"])))]
+    return []
+
+
+def rerunSeconds(log):
+    # duration of the last rerun appended to the open timing log, or None when it did not finish
+    seconds = None
+    for line in log:
+        record = json.loads(line)
+        if record["stage"] == "run":
+            seconds = record["ms"] / 1000
+
+    return seconds
+
+
+def runSession(seed, timeout, log):
+    # one session visiting every page in random order; yields (page, step, seconds, error) per interaction
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+    at.run()
+    yield "", "start", rerunSeconds(log), [str(e.value) for e in at.exception]
+    for page in rng.sample(PAGES, len(PAGES)):
+        steps = [("open", lambda at: widget(at.radio, "Go to").set_value(page))] + pageSteps(page, rng)
+        for step, action in steps:
+            try:
+                action(at).run()
+                error = [str(e.value) for e in at.exception]
+            except Exception as e:  # a widget that is missing also counts as a failed interaction
+                error = [repr(e)]
+            yield page, step, rerunSeconds(log), error
+
+
+def runWorker(seeds, concurrency, timeout):
+    # run the sessions of seeds in this process: the first one alone, as the first visitor after a deploy warms
+    # the caches, then the others with `concurrency` of them alive at once, taking turns interaction by
+    # interaction; returns the warmup and the other results, and the peak memory of the process
+    with tempfile.NamedTemporaryFile("w+", suffix=".jsonl") as log:
+        instrument.TIMING_LOG = log.name
+        warmup = list(runSession(seeds[0], timeout, log))
+        pending, live, results = list(seeds[1:]), [], []
+        while pending or live:
+            while pending and len(live) < concurrency:
+                live.append(runSession(pending.pop(0), timeout, log))
+            for session in list(live):
+                try:
+                    results.append(next(session))
+                except StopIteration:
+                    live.remove(session)
+
+    return warmup, results, peakMemory()
+
+
+def peakMemory():
+    # peak resident memory of the process so far, in MB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def summarize(times):
+    # count, median and percentiles of a list of seconds, in ms
+    ms = np.array(times) * 1000
+    return {"count": len(ms), "median": statistics.median(ms),
+            **{f"p{p}": float(np.percentile(ms, p)) for p in PERCENTILES}}
+
+
+def runLoadTest(sessions, concurrency, workers, timeout):
+    # spread the sessions over the worker processes (this one for a single worker); the first session of every
+    # worker is reported apart
+    baseline = peakMemory()
+    seeds = [list(range(sessions))[worker::workers] for worker in range(workers)]
+    start = time.perf_counter()
+    if workers == 1:
+        runs = [runWorker(seeds[0], concurrency, timeout)]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            runs = list(pool.map(runWorker, seeds, [concurrency] * workers, [timeout] * workers))
+    elapsed = time.perf_counter() - start
+    warmup = [result for run in runs for result in run[0]]
+    results = [result for run in runs for result in run[1]]
+
+    steps = {}
+    for page, step, seconds, error in results:
+        if seconds is not None:
+            steps.setdefault((page, step), []).append(seconds)
+    errors = [(page, step, error) for page, step, seconds, error in warmup + results if error]
+    return {"environment": environment(), "sessions": sessions, "concurrency": concurrency, "workers": workers,
+            "seconds": elapsed, "interactions per second": (len(warmup) + len(results)) / elapsed,
+            "baseline MB": baseline, "peak MB": max(run[2] for run in runs),
+            "warmup": summarize([seconds for page, step, seconds, error in warmup if seconds is not None]),
+            "overall": summarize([seconds for page, step, seconds, error in results if seconds is not None]),
+            "steps": [{"page": page, "step": step, **summarize(times)} for (page, step), times in steps.items()],
+            "errors": errors}
+
+
+def printReport(report):
+    # percentiles of every interaction and of all of them together
+    print(f"{report['sessions']} sessions, {report['concurrency']} at once in each of {report['workers']} "
+          f"workers, in {report['seconds']:.1f} s: {report['interactions per second']:.1f} interactions/s, peak "
+          f"memory {report['peak MB']:.0f} MB per worker ({report['baseline MB']:.0f} MB before)")
+    print(f"{'page':<24} {'step':<16} {'count':>6} " + " ".join(f"{f'p{p} ms':>9}" for p in PERCENTILES))
+    rows = report["steps"] + [dict(report["overall"], page="all", step=""),
+                              dict(report["warmup"], page="first session", step="")]
+    for row in rows:
+        print(f"{row['page']:<24} {row['step']:<16} {row['count']:>6} " +
+              " ".join(f"{row[f'p{p}']:9.1f}" for p in PERCENTILES))
+    for page, step, error in report["errors"]:
+        print(f"error on {page} / {step}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest")
+    parser.add_argument("--sessions", type=int, default=20, help="simulated sessions (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions alive at once in every worker "
+                                                                    "(default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, each with its own caches "
+                                                               "(default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds one rerun may take "
+                                                                    "(default: %(default)s)")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/load-<time>.json)")
+    args = parser.parse_args(argv)
+
+    report = runLoadTest(args.sessions, args.concurrency, args.workers, args.timeout)
+    printReport(report)
+    out = args.out or os.path.join(RESULT_DIR, time.strftime("load-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
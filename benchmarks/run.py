@@ -0,0 +1,139 @@
+# time every pipeline stage and page compute path on synthetic data of increasing scale and record the results
+# as json, e.g.
+#   python -m benchmarks.run --scales 1x 10x 100x
+#   python -m benchmarks.run --compare benchmarks/results/old.json benchmarks/results/new.json
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import honeybees as hb
+from benchmarks.synthetic import SCALES, scaleColonyData, writeSources
+from honeybees import figures
+
+RESULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def stateMeasure(cube):
+    # highest and lowest state average of every stressor, as stateMeasure does for one
+    for stressor in hb.STRESSORS:
+        state_means = cube["state"]["mean"][stressor]
+        state_means.max(), state_means.idxmax(), state_means.min(), state_means.idxmin()
+
+
+def rawDataPage(index):
+    # second page of the rows of one region without its first and last year, as the raw data viewer shows it
+    periods = index["all periods"]
+    selection = hb.selectRanges(index, region=next(iter(index["region"])), periodRange=(periods[4], periods[-5]))
+    return hb.pageRows(index, selection, 1)
+
+
+def benchStages(raw_df, regions, repeat, skip):
+    # run the stages in pipeline order, each on the output of the previous ones; yields (stage, seconds)
+    with tempfile.TemporaryDirectory() as tmp:
+        colonyPath, regionsPath = writeSources(raw_df, regions, tmp)
+        state = {}
+        stages = [
+            ("load", lambda: (pd.read_csv(colonyPath), pd.read_csv(regionsPath))),
+            ("merge", lambda: hb.prepareData(raw_df, regions)),
+            ("interpolation", lambda: hb.fillMissing(state["merge"])),
+            ("methodEvaluation", lambda: hb.evaluateMethods(state["merge"])),
+            ("compact", lambda: hb.compactFrame(state["interpolation"])),
+            ("cube", lambda: hb.aggregateCube(state["compact"])),
+            ("sliceIndex", lambda: hb.sliceIndex(state["compact"])),
+            ("stressorTest", lambda: [hb.significanceTests(state["compact"], state["cube"], grouping)
+                                      for grouping in ["quarter", "region"]]),
+            ("stateMeasure", lambda: stateMeasure(state["cube"])),
+            ("seasonality", lambda: hb.seasonalTable(state["compact"])),
+            ("forecast", lambda: hb.forecastColonies(state["compact"])),
+            ("endCountMeasure", lambda: hb.endCountShares(state["compact"], "state")),
+            ("rawDataPage", lambda: rawDataPage(state["sliceIndex"])),
+            ("choropleth_map", lambda: figures.choropleth_map(state["compact"], "varroa mites")),
+            ("customLine", lambda: figures.customLine(state["sliceIndex"], "South", "lost")),
+            ("stressorComparison", lambda: figures.stressorComparison(state["sliceIndex"],
+                                                                      next(iter(state["sliceIndex"]["state"])))),
+        ]
+        for stage, run in stages:
+            if stage in skip:
+                continue
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                state[stage] = run()
+                times.append(time.perf_counter() - start)
+            yield stage, times
+
+
+def environment():
+    # versions and commit the results were measured with
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(RESULT_DIR)).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "pandas": pd.__version__, "numpy": np.__version__, "machine": platform.machine()}
+
+
+def runBenchmarks(scales, missing, repeat, skip):
+    # import the lazily loaded libraries first, so their import time is not charged to the first stage using them
+    import plotly.express  # noqa: F401
+    import scipy.stats  # noqa: F401
+
+    raw_df, regions = hb.readSources()
+    results = []
+    for scale in scales:
+        groups, repeats = SCALES[scale]
+        scaled_df, scaled_regions = scaleColonyData(raw_df, regions, groups, repeats, missing)
+        for stage, times in benchStages(scaled_df, scaled_regions, repeat, skip):
+            results.append({"scale": scale, "rows": len(scaled_df), "stage": stage, "times": times,
+                            "best": min(times), "median": statistics.median(times)})
+            print(f"{scale:>6} {len(scaled_df):>9} rows  {stage:<18} {statistics.median(times) * 1000:10.1f} ms")
+
+    return {"environment": environment(), "missing": missing, "repeat": repeat, "results": results}
+
+
+def compareResults(basePath, newPath):
+    # median time of every stage in two result files, and the ratio new / base
+    with open(basePath) as f:
+        base = {(r["scale"], r["stage"]): r["median"] for r in json.load(f)["results"]}
+    with open(newPath) as f:
+        new = {(r["scale"], r["stage"]): r["median"] for r in json.load(f)["results"]}
+
+    print(f"{'scale':>6} {'stage':<18} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for key in [key for key in base if key in new]:
+        print(f"{key[0]:>6} {key[1]:<18} {base[key] * 1000:10.1f} {new[key] * 1000:10.1f} "
+              f"{new[key] / base[key]:7.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--scales", nargs="+", default=["1x", "10x", "100x"], choices=list(SCALES))
+    parser.add_argument("--missing", type=float, default=0.05, help="extra share of values blanked out")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage")
+    parser.add_argument("--skip", nargs="+", default=[], help="stages to leave out, e.g. choropleth_map")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/bench-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compareResults(*args.compare)
+        return
+
+    report = runBenchmarks(args.scales, args.missing, args.repeat, set(args.skip))
+    out = args.out or os.path.join(RESULT_DIR, time.strftime("bench-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# synthetic colony data with the schema of updated_colony_data.csv, scaled up from the real rows
+import os
+
+import numpy as np
+import pandas as pd
+
+# name: (pseudo-counties per state, repeats of the 2015-2020 history), about 1x, 10x, 100x and 1000x the rows;
+# 40x keeps the states but has a 960 quarter history, longer than the point budget of the line charts
+SCALES = {"1x": (1, 1), "10x": (10, 1), "40x": (1, 40), "100x": (25, 4), "1000x": (100, 10)}
+
+
+def scaleColonyData(raw_df, regions, groups=1, repeats=1, missing=0.0, seed=0):
+    # every state is split into `groups` pseudo-counties with jittered values, the history is repeated `repeats`
+    # times further back in time, and an extra `missing` share of the values is blanked out
+    rng = np.random.default_rng(seed)
+    years = raw_df["year"].max() - raw_df["year"].min() + 1
+    history = []
+    for repeat in range(repeats):
+        hist_df = raw_df.copy()
+        hist_df["year"] -= repeat * years
+        hist_df["period"] = hist_df["year"].astype(str) + hist_df["quarter"]
+        history.append(hist_df)
+    hist_df = pd.concat(history, ignore_index=True)
+
+    scaled_df = hist_df.loc[hist_df.index.repeat(groups)].reset_index(drop=True)
+    scaled_regions = regions.loc[regions.index.repeat(groups)].reset_index(drop=True)
+    if groups > 1:
+        scaled_df["state"] += " " + pd.Series(np.tile(np.arange(groups), len(hist_df))).astype(str).str.zfill(3)
+        scaled_regions["State"] += " " + pd.Series(np.tile(np.arange(groups), len(regions))).astype(str).str.zfill(3)
+
+    values = scaled_df.select_dtypes("number").columns.drop("year")
+    if groups > 1 or repeats > 1:
+        noise = rng.lognormal(0, 0.1, size=(len(scaled_df), len(values)))
+        scaled_df[values] = (scaled_df[values] * noise).round(1)
+    if missing > 0:
+        scaled_df[values] = scaled_df[values].mask(rng.random((len(scaled_df), len(values))) < missing)
+
+    # same row order as the source file
+    scaled_df = scaled_df.sort_values(["period", "state"], kind="stable").reset_index(drop=True)
+    return scaled_df, scaled_regions
+
+
+def writeSources(raw_df, regions, outDir):
+    # write the synthetic data as csv files laid out like the real sources; returns their paths
+    colonyPath, regionsPath = os.path.join(outDir, "updated_colony_data.csv"), os.path.join(outDir, "regions.csv")
+    raw_df.to_csv(colonyPath, index=False)
+    regions.to_csv(regionsPath, index=False)
+
+    return colonyPath, regionsPath
@@ -1,58 +1,87 @@
 # load libraries
+import hashlib
+import os
+import tempfile
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-import researchpy as rp
-
-# load data
-df = pd.read_csv("updated_colony_data.csv")
-regions = pd.read_csv("regions.csv")
-test_facts_df = pd.read_csv("test_facts.csv")
-seasonal_df = pd.read_csv("seasonal.csv")
-
-# data preprocessing ------
-df = df.merge(regions[["State", "Region"]], left_on="state", right_on="State")
-df = df.drop("State", axis=1).sort_values(by=["year", "state"])
-df.columns = df.columns.str.replace("_", " ")
-df.columns = df.columns.str.lower()
-df["new count"] = df["initial count"] - df["lost"]
-df["end count"] = df["initial count"] - df["lost"] + df["added"] + df["renovated"]
-copy_df = df.copy().sort_values(["state", "period"])  # avoid messing with original df
-
-# linear interpolation ------
-result_df = pd.DataFrame()
-for state in df["state"].unique():
-    st_df = df[df["state"] == state]
-    miss_df = st_df.loc[:, ~st_df.columns.isin(["lost perc", "renovated perc", "new count", "end count"])]
-    fill_df = miss_df.interpolate(method="linear", axis=0).ffill().bfill()
-    result_df = pd.concat([result_df, fill_df])
-
-# add back lost/renovated perc columns
-linear_df = pd.merge(result_df, copy_df[["state", "period", "lost perc", "renovated perc"]],
-                     on=["state", "period"], how="left")
-# fill in the missing lost/renovated perc values and
-linear_df["lost perc"].fillna(round(result_df["lost"] / result_df["initial count"] * 100), inplace=True)
-linear_df["renovated perc"].fillna(round(result_df["renovated"] / result_df["initial count"] * 100), inplace=True)
-linear_df["new count"] = result_df["initial count"] - result_df["lost"]
-linear_df["end count"] = result_df["initial count"] - result_df["lost"] + result_df["added"] + result_df["renovated"]
+import plotly.io as pio
+import honeybees as hb
+from honeybees import COUNTS, STRESSORS, figures
 
 # extra variables ------
-CUSTOMLABEL = {"font_size": 14, "font_family": "Calibri"}
-TRANSPARENT = 'rgba(0,0,0,0)'
-STRESSORS = ["varroa mites", "other pests", "diseases", "pesticides", "other", "unknown"]
-COUNTS = ["initial count", "max", "lost", "lost perc", "added", "renovated", "renovated perc", "new count", "end count"]
+FIGURE_CACHE_DIR = os.environ.get("FIGURE_CACHE_DIR")  # optional on-disk copy of the cached figures
+DEBUG_PANEL = os.environ.get("HONEYBEES_DEBUG")  # sidebar panel with the timings of the current rerun
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "honeybees-export")  # downloads of the raw data viewer
+FIGURE_CACHE_ENTRIES = 512  # figures kept per process, more than every state's charts take over all years
+DATA_VERSIONS = 2  # data versions whose dataset and results are kept per process: the current one and the last
 
-# round remaining columns
-linear_df[STRESSORS] = linear_df[STRESSORS].round(2)
-linear_df[COUNTS] = linear_df[COUNTS].round()
-# linear_df.to_csv("filled_colony_data.csv", index=False)
 
+@st.cache_data(show_spinner=False, max_entries=DATA_VERSIONS * len(hb.DATA_FILES))
+def fileHash(path, modified):
+    # content hash of a source file; the modification time is part of the key so the file is only reread when it changes
+    return hb.fileHash(path)
+
+
+def dataVersion():
+    # combined hash of every source file, used as the cache key for everything derived from the data
+    return hb.dataVersion([fileHash(path, os.stat(path).st_mtime_ns) for path in hb.DATA_FILES])
+
+
+@st.cache_resource(show_spinner=False)
+def latestBuild():
+    # most recent build of this process; a release that only appends rows to the colony file is ingested into it
+    return {}
+
+
+@hb.timedStage("loadData", cached=True)
+@st.cache_resource(show_spinner=False, max_entries=DATA_VERSIONS)
+def loadData(version):
+    # the dataset of this data version: precomputed artifacts when `python -m honeybees precompute` has written
+    # them, otherwise built from the source files; it is held once per process and shared by every session and
+    # rerun, so it is frozen: writing into the arrays of its frames raises, and a rerun changes the columns of its
+    # own view only. The sorted frames of the indexes replace the built ones, so every frame is held once
+    hb.cacheMiss()
+    previous = latestBuild()
+    dataset = hb.readArtifacts(version) or hb.buildDataset(version, previous.get("dataset"))
+    indexes = {"raw index": hb.sliceIndex(dataset["df"]), "linear index": hb.sliceIndex(dataset["linear"])}
+    dataset = hb.freezeDataset(dict(dataset, **indexes, df=indexes["raw index"]["frame"],
+                                    linear=indexes["linear index"]["frame"]))
+    previous["dataset"] = dataset
+
+    return dataset
+
+
+@hb.timedStage("significanceTests", cached=True)
+@st.cache_resource(show_spinner=False, max_entries=DATA_VERSIONS * len(hb.GROUPINGS))
+def significanceTests(version, grouping, equalVariances=False):
+    # t-tests of every stressor and group for the current data version, from the shared dataset rather than the
+    # view of the rerun, and frozen as every session shares them
+    hb.cacheMiss()
+    shared = loadData(version)
+    return hb.freezeDataset(hb.significanceTests(shared["linear"], shared["cube"], grouping, equalVariances))
+
+
+@hb.timedStage("endCountShares", cached=True)
+@st.cache_resource(show_spinner=False, max_entries=DATA_VERSIONS * len(hb.GROUPINGS))
+def endCountShares(version, grouping):
+    # end count > initial count shares of every group for the current data version, frozen as every session
+    # shares them
+    hb.cacheMiss()
+    return hb.freezeDataset(hb.endCountShares(loadData(version)["linear"], grouping))
+
+
+# load data; the timings of this rerun are recorded from here on when they are shown or logged. The rerun works on
+# its own view of the shared dataset, so changing the columns of its frames does not reach other sessions
+hb.startRun(enabled=bool(DEBUG_PANEL or hb.instrument.TIMING_LOG))
+version = dataVersion()
+dataset = hb.datasetView(loadData(version))
+cube, seasonal_df, test_facts_df = dataset["cube"], dataset["seasonal"], dataset["facts"]
+raw_index, linear_index = dataset["raw index"], dataset["linear index"]
+
+
+@hb.timedStage("stressorImpactMeasure")
 def stressorImpactMeasure():
     # determine which stressor has the greatest impact on bee colonies, on average
-    avg_df = linear_df.groupby("state", as_index=False).agg({"varroa mites": "mean", "other pests": "mean",
-                                                             "diseases": "mean", "pesticides": "mean",
-                                                             "other": "mean", "unknown": "mean"})
-
     st.markdown(f"""<b><p style="text-align:center; font-size:26px;">Most Impactful 
                 <span style="color:#ffcf20FF">Stressor</span></p></b>""", unsafe_allow_html=True)
     st.markdown(f"""<p style="text-align:center; font-size:20px;"><b>Varroa Mites</b></p>""", unsafe_allow_html=True)
@@ -60,71 +89,101 @@ def stressorImpactMeasure():
     with col2:
         st.markdown(f"""<p style="text-align:center; font-size:18px;">Accounts for the greatest percentage of bee 
                     colonies destroyed, on average, for all states from 2015-2020</p>""", unsafe_allow_html=True)
-    viewExp = st.expander("View state averages for stressors")
-    with viewExp:
+    # the state averages are only looked up and sent to the browser while they are shown, a page at a time
+    if st.checkbox("View state averages for stressors"):
+        state_means = cube["state"]["mean"]
+        page = pageNumber(-(-len(state_means) // hb.PAGE_SIZE), "averages page")
+        avg_df = state_means.iloc[page * hb.PAGE_SIZE:(page + 1) * hb.PAGE_SIZE][STRESSORS].reset_index()
         st.dataframe(avg_df)
 
 
-def choropleth_map(stressorChoice):
-    # visualize % colonies destroyed given stressor across the country using a color scale
-    fig1 = px.choropleth(linear_df,
-                         locations="state code",
-                         locationmode="USA-states",
-                         scope="usa",
-                         color=stressorChoice,
-                         color_continuous_scale="Viridis_r",
-                         animation_frame="period",
-                         template="seaborn",
-                         labels={stressorChoice: "% Destroyed"},
-                         custom_data=["state", stressorChoice])
-    # map appearance adjustments
-    customTemp = "<br>".join(["%{customdata[0]}", "%{customdata[1]} %"])
-    fig1.update_layout(title_text=f"Percentage of colonies destroyed by {stressorChoice}", title_x=0.5,
-                       paper_bgcolor=TRANSPARENT,
-                       geo=dict(bgcolor=TRANSPARENT))
-    fig1.update_traces(hovertemplate=customTemp, hoverlabel=CUSTOMLABEL)
-    # change hover text for each animation frame
-    for frame in fig1.frames:
-        frame.data[0].hovertemplate = customTemp
-        frame.data[0].hoverlabel = CUSTOMLABEL
-
-    return fig1
-
-
+def pageNumber(pages, key):
+    # page (from 0) picked by the user; the picker is only shown when there is more than one page
+    if pages <= 1:
+        return 0
+    return st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=key) - 1
+
+
+@hb.timedStage("forecasts", cached=True)
+@st.cache_resource(show_spinner=False, max_entries=DATA_VERSIONS)
+def forecasts(version):
+    # forecast of the next quarters of every state for the current data version, shared by every session
+    hb.cacheMiss()
+    return hb.freezeDataset(hb.forecastColonies(loadData(version)["linear"]))
+
+
+@hb.timedStage("figurePayload", cached=True)
+@st.cache_data(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def figurePayload(version, figureName, *args):
+    # serialized figure json, built once per figure, arguments and data version; also written to FIGURE_CACHE_DIR,
+    # named with the builder version too, when it is set, so a restarted process can skip building the figure
+    hb.cacheMiss()
+    # the line charts take the data they are drawn from ("raw", "linear", or "forecast" for the linear data with
+    # the forecast quarters) and the state; they are cached over all years only
+    shared = loadData(version)
+    indexes = {"raw": shared["raw index"], "linear": shared["linear index"], "forecast": shared["linear index"]}
+    def forecast(frame):
+        return forecasts(version) if frame == "forecast" else None
+
+    builders = {"choropleth": lambda stressorChoice: figures.choropleth_map(shared["linear"], stressorChoice),
+                "seasonal": lambda: figures.seasonalMap(shared["seasonal"]),
+                "stressorComparison": lambda frame, state: figures.stressorComparison(
+                    indexes[frame], state, forecast_df=forecast(frame)),
+                "countBars": lambda frame, state: figures.countBars(
+                    indexes[frame], state, forecast_df=forecast(frame)),
+                "populationLines": lambda frame, state: figures.populationLines(
+                    indexes[frame], state, forecast_df=forecast(frame))}
+    path = None
+    if FIGURE_CACHE_DIR:
+        fileName = "-".join([figureName, *args, version, figures.BUILDER_VERSION]).replace(" ", "_") + ".json"
+        path = os.path.join(FIGURE_CACHE_DIR, fileName)
+        if os.path.exists(path):
+            with open(path) as f:
+                return f.read()
+
+    payload = builders[figureName](*args).to_json()
+    if path:
+        # written next to its final name and moved there when complete, so no process reads a partial file
+        os.makedirs(FIGURE_CACHE_DIR, exist_ok=True)
+        fd, partial = tempfile.mkstemp(suffix=".partial", dir=FIGURE_CACHE_DIR)
+        with os.fdopen(fd, "w") as f:
+            f.write(payload)
+        os.replace(partial, path)
+
+    return payload
+
+
+@hb.timedStage("cachedFigure", cached=True)
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def cachedFigure(version, figureName, *args):
+    # figure read back from its cached payload once per process; st.plotly_chart only reads it, so it is shared
+    hb.cacheMiss()
+    return hb.freezeDataset(pio.from_json(figurePayload(version, figureName, *args)))
+
+
+def plotlyChart(fig, figureName):
+    # st.plotly_chart timed as a stage of the rerun, with the size of the figure json sent to the browser
+    with hb.timed("plotly_chart", figure=figureName) as record:
+        st.plotly_chart(fig)
+    if hb.instrumenting():
+        record["bytes"] = len(fig.to_json())
+
+
+@hb.timedStage("stressorTest")
 def stressorTest(grouping):
     # conduct t-test to determine if there is a difference in means
-    test_df = linear_df.groupby(grouping, as_index=False).agg({"varroa mites": "mean", "other pests": "mean",
-                                                        "diseases": "mean", "pesticides": "mean",
-                                                        "other": "mean", "unknown": "mean"})
-    test_df = test_df.sort_values(grouping)
-    ans_df = test_df.copy()
-    groupList = []
-    if grouping == "quarter":
-        groupList = ["Q1", "Q2", "Q3", "Q4"]
-    elif grouping == "region":
-        groupList = ["Midwest", "Northeast", "South", "West"]
-
-    # run t-test to compare means
-    for var in STRESSORS:
-        for x in groupList:
-            summary, results = rp.ttest(group1=linear_df[var][linear_df[grouping] == x], group1_name=x,
-                                        group2=linear_df[var], group2_name="overall")
-            ALPHA = 0.05
-            p_value = results.iloc[3, 1]
-            if p_value < ALPHA:
-                ans_df[var][ans_df[grouping] == x] = "reject"
-            else:
-                ans_df[var][ans_df[grouping] == x] = "fail"
-            # view raw test results: measures were manually inputted into another file for stressorTestMeasure
-            # st.write(x, var)
-            # st.write(results[0:4])
-            # st.write(summary.iloc[0:2, [0, 2, 1]])
+    test_df = cube[grouping]["mean"][STRESSORS].reset_index()
+    # t-test results to compare means
+    tests_df = significanceTests(version, grouping)
+    ans_df = tests_df.pivot(index=grouping, columns="stressor", values="result")[STRESSORS].reset_index()
+    ans_df.columns.name = None
 
     # display compact test and result tables
     st.dataframe(test_df)
     st.dataframe(ans_df)
 
 
+@hb.timedStage("stressorTestMeasure")
 def stressorTestMeasure(stressorChoice):
     # corresponding to the stressorTest, display the quarterly and regional effect measures
     col1, col2, col3 = st.columns([1, 0.20, 1])  # width of text boxes
@@ -142,12 +201,14 @@ def stressorTestMeasure(stressorChoice):
                     unsafe_allow_html=True)
 
 
+@hb.timedStage("stateMeasure")
 def stateMeasure(stressorChoice):
     # determine which state corresponds to the greatest % of colonies destroyed of given stressor
-    stateHighVal = round(linear_df.groupby(["state"])[stressorChoice].mean().max(), 1)
-    stateHigh = linear_df.groupby(["state"])[stressorChoice].mean().idxmax()
-    stateLowVal = round(linear_df.groupby(["state"])[stressorChoice].mean().min(), 1)
-    stateLow = linear_df.groupby(["state"])[stressorChoice].mean().idxmin()
+    state_means = cube["state"]["mean"][stressorChoice]
+    stateHighVal = round(state_means.max(), 1)
+    stateHigh = state_means.idxmax()
+    stateLowVal = round(state_means.min(), 1)
+    stateLow = state_means.idxmin()
 
     col1, col2, col3 = st.columns([0.20, 1, 0.20])
     with col2:
@@ -159,135 +220,117 @@ def stateMeasure(stressorChoice):
                     {stateLowVal} % of bee colonies destroyed by {stressorChoice}</p>""", unsafe_allow_html=True)
 
 
-def stressorComparison(data, stateChoice):
-    # comparison of % colonies destroyed across stressors within selected state
-    # can isolate each stressor by selecting in legend
-    state_df = data[data["state"] == stateChoice]
-    fig1 = px.line(state_df,
-                   x="period",
-                   y=STRESSORS,
-                   labels={"value": "percentage", "variable": "stressor"},
-                   color_discrete_sequence=px.colors.qualitative.T10)
-    # line graph appearance adjustments
-    fig1.update_layout(title_text=f"Percentage of colonies destroyed across stressors in {stateChoice}",
-                       title_x=0.5, paper_bgcolor=TRANSPARENT,
-                       plot_bgcolor=TRANSPARENT)
-    fig1.update_xaxes(tickangle=40)
-    fig1.update_traces(hoverlabel=CUSTOMLABEL)
-
-    return fig1
-
-
-def effortsGraph(data, stateChoice, timeFrameChoice):
-    state_df = data[data["state"] == stateChoice]
+@hb.timedStage("effortsGraph")
+def effortsGraph(stateChoice, timeFrameChoice):
     # sidebar user option for time range
     if timeFrameChoice == "custom range":
-        start, end = st.sidebar.select_slider("Pick a time frame", list(data["period"].unique()),
-                                              value=["2015Q1", "2020Q4"])
-        timeMask = (state_df["period"] >= start) & (state_df["period"] <= end)
-        state_df = state_df.loc[timeMask]
-
-    # comparison of colony numbers of initial counts to end count
-    fig1 = px.bar(state_df,
-                  x="period",
-                  y=["initial count", "end count"],
-                  barmode="group",
-                  labels={"value": "number of colonies", "variable": "counts"},
-                  color_discrete_map={"initial count": "#714925", "end count": "#FFD220"})
-    fig1.update_layout(title_text=f"Initial vs. end colony population counts in {stateChoice}", title_x=0.5,
-                       paper_bgcolor=TRANSPARENT, plot_bgcolor=TRANSPARENT)
-    fig1.update_xaxes(tickangle=40)
-    fig1.update_traces(hoverlabel=CUSTOMLABEL)
-
-    # general colony population change
-    # new count used instead of lost to provide better comparison with initial and max
-    fig2 = px.line(state_df,
-                   x="period",
-                   y=["max", "initial count", "new count"],
-                   labels={"value": "number of colonies", "variable": "counts"},
-                   color_discrete_sequence=px.colors.qualitative.T10)
-    fig2.update_layout(title_text=f"Colony population change in {stateChoice}", title_x=0.5,
-                       paper_bgcolor=TRANSPARENT, plot_bgcolor=TRANSPARENT)
-    fig2.update_xaxes(tickangle=40)
-    fig2.update_traces(hoverlabel=CUSTOMLABEL)
-
-    return fig1, fig2
+        periodRange = st.sidebar.select_slider("Pick a time frame", list(linear_index["all periods"]),
+                                               value=["2015Q1", "2020Q4"])
+        # custom ranges are built for this rerun only, so they do not fill the caches shared by every session
+        return (figures.countBars(linear_index, stateChoice, periodRange, forecasts(version)),
+                figures.populationLines(linear_index, stateChoice, periodRange, forecasts(version)))
 
+    return (cachedFigure(version, "countBars", "forecast", stateChoice),
+            cachedFigure(version, "populationLines", "forecast", stateChoice))
 
+
+@hb.timedStage("endCountMeasure")
 def endCountMeasure(stateChoice):
     # determine what percentage of colony populations have an end count that is higher than the initial count
-    state_df = linear_df[linear_df["state"] == stateChoice][["initial count", "end count"]]
-    greater_df = state_df[state_df["end count"] > state_df["initial count"]]
-    perc = (len(greater_df)/len(state_df))*100
+    perc = endCountShares(version, "state")[stateChoice]
 
     return perc
 
 
+@hb.timedStage("interpolationSummary", cached=True)
+@st.cache_data(show_spinner=False, max_entries=DATA_VERSIONS)
+def interpolationSummary(version):
+    # mean error of every interpolation method on masked known values per variable, for the current data version;
+    # scored by `python -m honeybees precompute`, or here when the dataset was not loaded from its artifacts, in this
+    # process as the server should not fork a process pool
+    hb.cacheMiss()
+    shared = loadData(version)
+    scores_df = shared.get("evaluation")
+    if scores_df is None:
+        scores_df = hb.evaluateMethods(hb.expandFrame(shared["df"]), workers=1)
+
+    return hb.methodSummary(scores_df)
+
+
+@hb.timedStage("interpolationMeasure")
+def interpolationMeasure(graphOption):
+    # compare the interpolation methods on the category of variables shown in the before and after charts
+    summary_df = interpolationSummary(version)
+    columns = STRESSORS if graphOption == "stressors" else [col for col in hb.EVAL_COLUMNS if col not in STRESSORS]
+
+    st.markdown(f"""<p style="font-size:18px;">To measure this choice, {round(hb.MASK_SHARE * 100)}% of the known 
+                values of every state were hidden and filled in again with each method. The table shows the mean
+                absolute error of each method per variable, lower is better.</p>""", unsafe_allow_html=True)
+    st.dataframe(summary_df[summary_df["column"].isin(columns)].round(2))
+
+
+def exportFile(version, frame, states, region, periodRange, fileFormat):
+    # file with the selected rows of the raw or filled frame, written in chunks once per selection, format and
+    # data version and shared by the processes of the server; it is written again when it has been cleaned up.
+    # Streamlit reads it back for the download button
+    digest = hashlib.sha1(repr((version, states, region, periodRange)).encode()).hexdigest()[:16]
+    path = os.path.join(EXPORT_DIR, f"{frame}-{digest}.{fileFormat}")
+    if os.path.exists(path):
+        return path
+
+    index = {"raw": raw_index, "linear": linear_index}[frame]
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    return hb.exportRows(index, hb.selectRanges(index, states, region, periodRange), path, fileFormat)
+
+
+@hb.timedStage("rawDataViewer")
+def rawDataViewer():
+    # before and after interpolation tables of the rows matching the filters, one page at a time; the rows are
+    # selected from the sorted index, and only the shown page is converted and sent to the browser
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        states = st.multiselect("Filter by state(s)", list(linear_index["state"]), key="viewer states")
+    with col2:
+        region = st.selectbox("Filter by region", ["all regions"] + list(linear_index["region"]), key="viewer region")
+    periods = linear_index["all periods"]
+    periodRange = st.select_slider("Filter by period", periods, value=[periods[0], periods[-1]], key="viewer periods")
+    region = None if region == "all regions" else region
+    periodRange = None if list(periodRange) == [periods[0], periods[-1]] else tuple(periodRange)
+
+    raw_selection = hb.selectRanges(raw_index, states, region, periodRange)
+    linear_selection = hb.selectRanges(linear_index, states, region, periodRange)
+    rows = hb.selectedRows(linear_selection)
+    page = pageNumber(hb.pageCount(linear_selection), "viewer page")
+    st.markdown(f"""<p style="font-size:14px;">Rows {min(page * hb.PAGE_SIZE + 1, rows)} to 
+                {min((page + 1) * hb.PAGE_SIZE, rows)} of {rows}</p>""", unsafe_allow_html=True)
+
+    col1, col2, col3 = st.columns([1, 0.25, 1])
+    with col1:
+        st.markdown(f"""<b><p style="text-align:center; font-size:26px;">Before</p></b>""",
+                    unsafe_allow_html=True)
+        st.dataframe(hb.pageRows(raw_index, raw_selection, page))
+    with col3:
+        st.markdown(f"""<b><p style="text-align:center; font-size:26px;">After</p></b>""",
+                    unsafe_allow_html=True)
+        st.dataframe(hb.pageRows(linear_index, linear_selection, page))
+
+    # the file is only written once the download is asked for
+    if st.checkbox("Download the selected rows"):
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            frame = st.radio("Data", ["after interpolation", "before interpolation"], key="viewer frame")
+        with col2:
+            fileFormat = st.radio("Format", hb.EXPORT_FORMATS, key="viewer format")
+        frame = "linear" if frame == "after interpolation" else "raw"
+        path = exportFile(version, frame, states, region, periodRange, fileFormat)
+        with open(path, "rb") as f:
+            st.download_button("Download", f, file_name=f"honey-bees-{frame}.{fileFormat}")
+
+
+@hb.timedStage("seasonalMeasure")
 def seasonalMeasure():
-    seasonal_states_df = seasonal_df[seasonal_df["seasonal"] == "yes"]
-    q13_df = seasonal_states_df[(seasonal_states_df["Q1"] == "low") & (seasonal_states_df["Q3"] == "high")]
-
-    fig1 = px.choropleth(q13_df,
-                         locations="state code",
-                         locationmode="USA-states",
-                         scope="usa",
-                         template="seaborn",
-                         custom_data=["state"],
-                         color_discrete_sequence=px.colors.qualitative.Plotly_r)
-
-    customTemp = "<br>".join(["%{customdata[0]}"])
-    fig1.update_layout(title_text=f"States with low counts in Q1 and high counts in Q3", title_x=0.5,
-                       paper_bgcolor=TRANSPARENT,
-                       geo=dict(bgcolor=TRANSPARENT))
-    fig1.update_traces(hovertemplate=customTemp, hoverlabel=CUSTOMLABEL)
-    st.plotly_chart(fig1)
-
-
-def customLine(locFilter, colChoice):
-    # % colonies destroyed by selected stressor for selected state(s)
-    customTemp = "%{customdata[0]}"
-    customTitle = ""
-    if colChoice in STRESSORS:
-        customTitle = f"Percentage of colonies destroyed by {colChoice} across states"
-        customTemp = "%{customdata[0]} %"
-    elif colChoice == "initial count":
-        customTitle = "Initial total count of colonies quarterly by state"
-    elif colChoice == "max":
-        customTitle = "Maximum amount of colonies recorded quarterly by state"
-    elif colChoice == "lost":
-        customTitle = "Total colonies lost quarterly by state"
-    elif colChoice == "lost perc":
-        customTitle = "Percentage of colonies lost from initial count quarterly by state"
-        customTemp = "%{customdata[0]} %"
-    elif colChoice == "added":
-        customTitle = f"Total colonies added quarterly by state"
-    elif colChoice == "renovated":
-        customTitle = "Total colonies renovated quarterly by state"
-    elif colChoice == "renovated perc":
-        customTitle = "Percentage of colonies renovated quarterly by state"
-        customTemp = "%{customdata[0]} %"
-
-    if locFilter in linear_df["region"].unique():
-        fig1 = px.line(linear_df[linear_df["region"] == locFilter],
-                       x="period",
-                       y=colChoice,
-                       color="state",
-                       custom_data=[colChoice])
-        customTitle = customTitle[:36] + colChoice + " in the " + locFilter
-    else:
-        # allow column selection paired with stateChoice multiselect for user-select parameter comparisons
-        fig1 = px.line(linear_df[linear_df["state"].isin(locFilter)],
-                       x="period",
-                       y=colChoice,
-                       color="state",
-                       custom_data=[colChoice])
-    # custom line graph appearance adjustments
-    fig1.update_layout(title_text=customTitle, title_x=0.5, paper_bgcolor=TRANSPARENT,
-                       plot_bgcolor=TRANSPARENT)
-    fig1.update_xaxes(tickangle=40)
-    fig1.update_traces(hovertemplate=customTemp, hoverlabel=CUSTOMLABEL)
-
-    return fig1
+    # states with low counts in Q1 and high counts in Q3, from the seasonality detected in the new counts
+    plotlyChart(cachedFigure(version, "seasonal"), "seasonal")
 
 
 def main():
@@ -360,10 +403,10 @@ def main():
         stressorChoice = st.sidebar.selectbox("Select stressor", STRESSORS, index=0)
         # show graph for the most affected state for given stressor
         customIndex = {"varroa mites": 8, "other pests": 8, "diseases": 26, "pesticides": 13, "other": 35, "unknown": 43}
-        stateChoice = st.sidebar.selectbox("Select state", list(linear_df["state"].unique()), index=customIndex[stressorChoice])
+        stateChoice = st.sidebar.selectbox("Select state", list(linear_index["state"]), index=customIndex[stressorChoice])
         st.markdown(f"""<b><p style="font-size:30px;">Damage caused by <span style="color:#ffcf20FF"
                     >{stressorChoice}</span>\n\n</p></b>""", unsafe_allow_html=True)
-        st.plotly_chart(choropleth_map(stressorChoice))
+        plotlyChart(cachedFigure(version, "choropleth", stressorChoice), "choropleth")
 
         # display text
         stressorTestMeasure(stressorChoice)
@@ -371,11 +414,14 @@ def main():
 
         st.markdown(f"""<br><b><p style="font-size:30px;">Overall damage within <span style="color:#ffcf20FF"
                     >State</span>\n\n</p></b>""", unsafe_allow_html=True)
-        line1 = stressorComparison(linear_df, stateChoice)
-        st.plotly_chart(line1)
-
-        viewExp = st.expander("View source data and test results from analysis")
-        with viewExp:
+        line1 = cachedFigure(version, "stressorComparison", "forecast", stateChoice)
+        plotlyChart(line1, "stressorComparison")
+        st.markdown(f"""<p style="text-align:center; font-size:12px;">Note: dashed lines forecast the next 
+                    {hb.FORECAST_QUARTERS} quarters from the seasonal pattern and trend of each stressor in 
+                    {stateChoice}</p>""", unsafe_allow_html=True)
+
+        # the t-tests only run, once per grouping and data version, when their results are shown
+        if st.checkbox("View source data and test results from analysis"):
             grouping = st.selectbox("Group by", ["quarter", "region"])
             stressorTest(grouping)
 
@@ -389,15 +435,15 @@ def main():
         st.markdown(f"""<p style="font-size:18px;">{intro}\n\n</p>""", unsafe_allow_html=True)
 
         # sidebar user options
-        stateChoice = st.sidebar.selectbox("Select state", list(linear_df["state"].unique()), index=18)
+        stateChoice = st.sidebar.selectbox("Select state", list(linear_index["state"]), index=18)
         view_all = st.sidebar.checkbox("View percentages for all states")
         timeFrameChoice = st.sidebar.radio("Select time frame", ["all years", "custom range"])
 
-        gbar1, line1 = effortsGraph(linear_df, stateChoice, timeFrameChoice)
-        st.plotly_chart(gbar1)
+        gbar1, line1 = effortsGraph(stateChoice, timeFrameChoice)
+        plotlyChart(gbar1, "efforts bar")
         st.markdown(f"""<p style="text-align:center; font-size:12px;">Note: end count is the initial count minus
-                    the lost colonies and plus the number of added and renovated colonies</p>""",
-                    unsafe_allow_html=True)
+                    the lost colonies and plus the number of added and renovated colonies; hatched bars forecast
+                    the next {hb.FORECAST_QUARTERS} quarters</p>""", unsafe_allow_html=True)
         # display text
         perc = round(endCountMeasure(stateChoice))
         st.markdown(f"""<b><p style="text-align:center; font-size:26px;">
@@ -405,23 +451,17 @@ def main():
                     numbers greater than the initial count at the end of each quarter in {stateChoice}</p></b>""",
                     unsafe_allow_html=True)
 
-        # display all state percentages if checked
-        perc_data = pd.DataFrame(columns=["state", "percentage"])
+        # display all state percentages if checked, or broken down by region or quarter
         if view_all:
-            for state in list(linear_df["state"].unique()):
-                perc = round(endCountMeasure(state), 2)
-                perc_data.loc[len(perc_data)] = state, perc
+            shareGrouping = st.sidebar.selectbox("Group percentages by", ["state", "region", "quarter"])
+            perc_data = endCountShares(version, shareGrouping).round(2).reset_index()
             st.dataframe(perc_data)
 
-        # view each state plot to observe seasonality; used to create seasonal file
-        # for state in (list(df["state"].unique())):
-        #     gbar1, line1 = effortsGraph(linear_df, state, timeFrameChoice)
-        #     st.plotly_chart(line1)
-
         st.markdown("<br>", unsafe_allow_html=True)
-        st.plotly_chart(line1)
+        plotlyChart(line1, "efforts line")
         st.markdown(f"""<p style="text-align:center; font-size:12px;">Note: new count is obtained by 
-                    subtracting the total colonies lost from the initial count</p>""", unsafe_allow_html=True)
+                    subtracting the total colonies lost from the initial count; the dashed line forecasts the
+                    initial count</p>""", unsafe_allow_html=True)
         context = """Meanwhile, studying when bee colony populations are at its highest and lowest can also point to 
                      the possible seasonal effects due to weather, time of the year, or other factors. This can be
                      observed by viewing colony population change for new count with each state. Of the states
@@ -443,13 +483,13 @@ def main():
         with optionExpander:
             locChoice = st.selectbox("Filter location by", ["state(s)", "region"])
             if locChoice == "state(s)":
-                locFilter = st.multiselect("Select state(s)", list(linear_df["state"].unique()),
+                locFilter = st.multiselect("Select state(s)", list(linear_index["state"]),
                                            default=["California", "Texas"])
             else:
-                locFilter = st.selectbox("Select state(s)", list(linear_df["region"].unique()), index=2)
+                locFilter = st.selectbox("Select state(s)", list(linear_index["region"]), index=1)
             colChoice = st.selectbox("Select variable", STRESSORS + COUNTS)
 
-        st.plotly_chart(customLine(locFilter, colChoice))  # additional graph
+        plotlyChart(figures.customLine(linear_index, locFilter, colChoice), "customLine")  # additional graph
 
         st.markdown(f"""<b><p style="font-size:26px;">Determining how to interpolate the missing values</p></b>""",
                     unsafe_allow_html=True)
@@ -468,29 +508,28 @@ def main():
                     data which were filled in accordingly. </p><br>""", unsafe_allow_html=True)
         optionExpander2 = st.expander("Select options")
         with optionExpander2:
-            exampleState = st.selectbox("Select state", df["state"].unique(), index=8)
+            exampleState = st.selectbox("Select state", list(raw_index["state"]), index=8)
             graphOption = st.selectbox("Select category of data", ["stressors", "counts"])
             viewData = st.checkbox("View raw data")
 
-        # compare charts for before and after interpolation
-        if graphOption == "stressors":
-            st.plotly_chart(stressorComparison(df, exampleState))
-            st.plotly_chart(stressorComparison(linear_df, exampleState))
-        else:
-            line1, line2 = effortsGraph(df, exampleState, timeFrameChoice="all years")
-            line3, line4 = effortsGraph(linear_df, exampleState, timeFrameChoice="all years")
-            st.plotly_chart(line2)
-            st.plotly_chart(line4)
+        # compare charts for before and after interpolation; only the two charts of the chosen category are built
+        figureName = "stressorComparison" if graphOption == "stressors" else "populationLines"
+        plotlyChart(cachedFigure(version, figureName, "raw", exampleState), figureName + " raw")
+        plotlyChart(cachedFigure(version, figureName, "linear", exampleState), figureName + " linear")
+        interpolationMeasure(graphOption)
         if viewData:
-            col1, col2, col3 = st.columns([1, 0.25, 1])
-            with col1:
-                st.markdown(f"""<b><p style="text-align:center; font-size:26px;">Before</p></b>""",
-                            unsafe_allow_html=True)
-                st.dataframe(df.sort_values(["state", "period"]))
-            with col3:
-                st.markdown(f"""<b><p style="text-align:center; font-size:26px;">After</p></b>""",
-                            unsafe_allow_html=True)
-                st.dataframe(linear_df)
+            rawDataViewer()
+
+    # timings of this rerun, slowest stages first, with the cache hits and misses of the process so far
+    records = hb.finishRun(page=navChoice)
+    if DEBUG_PANEL:
+        debugExp = st.sidebar.expander("Render timings")
+        with debugExp:
+            st.markdown(f"""<p style="font-size:14px;">{round(records[0]["ms"])} ms for this rerun</p>""",
+                        unsafe_allow_html=True)
+            timing_df = pd.DataFrame(records[1:], columns=["stage", "figure", "depth", "ms", "bytes", "cache"])
+            st.dataframe(timing_df.sort_values("ms", ascending=False).round(1))
+            st.dataframe(pd.DataFrame(hb.cacheCounts()).T)
 
 
 if __name__ == "__main__":
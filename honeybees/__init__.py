@@ -0,0 +1,18 @@
+# headless core of the honey bees app: data loading, interpolation, derived columns, statistics and seasonality,
+# without streamlit, so it can be imported, timed and reused by batch jobs
+from honeybees.data import (CATEGORIES, COLONY_COUNTS, COUNTS, DATA_FILES, DERIVED, PERCENTAGES, STRESSORS,
+                            appendedRows, codeVersion, compactFrame, dataVersion, deriveColumns, expandFrame, fileHash,
+                            fillMissing, ingestQuarter, interpolateGroups, prepareData, readOnly, readSources,
+                            sliceIndex, sliceRows, sourceStamp)
+from honeybees.downsample import DOWNSAMPLING, POINT_BUDGET, downsampleRows, lttbPositions, minMaxPositions
+from honeybees.evaluation import EVAL_COLUMNS, MASK_SHARE, METHODS, evaluateMethods, fillValues, methodSummary
+from honeybees.forecast import FORECAST_COLUMNS, FORECAST_QUARTERS, forecastColonies, holtWinters
+from honeybees.instrument import (TIMING_LOG, cacheCounts, cacheMiss, finishRun, instrumenting, startRun, timed,
+                                  timedStage)
+from honeybees.pipeline import (ARTIFACT_DIR, artifactVersion, buildDataset, datasetView, exportCsv, freezeDataset,
+                                readArtifacts, readManifest, writeArtifacts)
+from honeybees.seasonal import QUARTERS, seasonalProfiles, seasonalTable
+from honeybees.stats import (ALPHA, CUBE_STATS, GROUPINGS, aggregateCube, effectFact, endCountShares,
+                             significanceTests, testFacts, updateCube)
+from honeybees.viewer import (EXPORT_CHUNK, EXPORT_FORMATS, PAGE_SIZE, exportRows, pageCount, pageRows, selectRanges,
+                              selectedRows, windowRows)
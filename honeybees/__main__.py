@@ -0,0 +1,48 @@
+# command line entry point, e.g. python -m honeybees precompute
+import argparse
+
+from honeybees.data import dataVersion, expandFrame
+from honeybees.evaluation import evaluateMethods
+from honeybees.instrument import TIMING_LOG, finishRun, startRun, timed
+from honeybees.pipeline import ARTIFACT_DIR, artifactVersion, buildDataset, exportCsv, writeArtifacts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m honeybees")
+    commands = parser.add_subparsers(dest="command", required=True)
+    precompute = commands.add_parser("precompute", help="build the filled data, aggregate cube, test facts and "
+                                                        "seasonality and store them for the app to load at startup")
+    precompute.add_argument("--out", default=ARTIFACT_DIR, help="artifact directory (default: %(default)s)")
+    precompute.add_argument("--csv", action="store_true",
+                            help="also rewrite filled_colony_data.csv, test_facts.csv and seasonal.csv")
+    precompute.add_argument("--workers", type=int, help="processes scoring the interpolation methods "
+                                                        "(default: one per cpu)")
+    precompute.add_argument("--force", action="store_true",
+                            help="build again even when the artifacts are already for the current data and code")
+    precompute.add_argument("--timings", action="store_true", help="print how long every stage took (they are "
+                                                                   "also logged to HONEYBEES_TIMING_LOG when set)")
+    args = parser.parse_args(argv)
+
+    if args.command == "precompute":
+        version = dataVersion()
+        if not (args.force or args.csv) and artifactVersion(args.out) == version:
+            print(f"artifacts in {args.out} are up to date for data version {version} and the current code")
+            return
+        startRun(enabled=bool(args.timings or TIMING_LOG), command="precompute")
+        dataset = buildDataset(version)
+        with timed("methodEvaluation"):
+            dataset["evaluation"] = evaluateMethods(expandFrame(dataset["df"]), workers=args.workers)
+        with timed("writeArtifacts"):
+            writeArtifacts(dataset, args.out)
+        if args.csv:
+            with timed("exportCsv"):
+                exportCsv(dataset)
+        records = finishRun()
+        print(f"wrote artifacts for data version {dataset['version']} to {args.out}")
+        if args.timings:
+            for record in records:
+                print(f"{'  ' * (record['depth'] + 1)}{record['stage']:<20}{record['ms']:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
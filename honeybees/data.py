@@ -0,0 +1,248 @@
+# loading, preprocessing and interpolation of the colony data
+import hashlib
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.dirname(PACKAGE_DIR)
+COLONY_FILE = os.path.join(DATA_DIR, "updated_colony_data.csv")
+REGIONS_FILE = os.path.join(DATA_DIR, "regions.csv")
+SEASONAL_FILE = os.path.join(DATA_DIR, "seasonal.csv")  # csv snapshot of the detected seasonality
+DATA_FILES = [COLONY_FILE, REGIONS_FILE]
+
+STRESSORS = ["varroa mites", "other pests", "diseases", "pesticides", "other", "unknown"]
+COUNTS = ["initial count", "max", "lost", "lost perc", "added", "renovated", "renovated perc", "new count", "end count"]
+DERIVED = ["lost perc", "renovated perc", "new count", "end count"]
+
+# dtypes of the compact frames the app keeps in memory
+CATEGORIES = ["state", "state code", "region", "quarter"]
+PERCENTAGES = STRESSORS + ["lost perc", "renovated perc"]
+COLONY_COUNTS = ["initial count", "max", "lost", "added", "renovated", "new count", "end count"]
+FLOAT32_DECIMALS = 4  # float32 keeps the 1-2 decimals of the percentages exactly up to this many decimals
+
+
+def fileHash(path):
+    # content hash of a source file
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def dataVersion(hashes=None):
+    # combined hash of every source file, used as the key for everything derived from the data
+    if hashes is None:
+        hashes = [fileHash(path) for path in DATA_FILES]
+    return hashlib.sha1("".join(hashes).encode()).hexdigest()
+
+
+def codeVersion(modules=None):
+    # combined hash of the sources of the given modules of this package (every module by default), kept next to
+    # the data version of anything derived from the data so it is built again when the code deriving it changes
+    if modules is None:
+        modules = sorted(name[:-3] for name in os.listdir(PACKAGE_DIR) if name.endswith(".py"))
+    return dataVersion([fileHash(os.path.join(PACKAGE_DIR, f"{module}.py")) for module in modules])
+
+
+def readSources():
+    # raw colony rows and regions, as stored in the source files
+    return pd.read_csv(COLONY_FILE), pd.read_csv(REGIONS_FILE)
+
+
+def sourceStamp(content):
+    # size and hash of the colony file content a dataset is built from
+    return {"size": len(content), "hash": hashlib.sha1(content).hexdigest()}
+
+
+def appendedRows(content, stamp):
+    # colony rows that the file content appends to the content of stamp, or None when the file changed otherwise
+    size = stamp["size"]
+    if len(content) <= size or content[size - 1:size] != b"\n" or sourceStamp(content[:size]) != stamp:
+        return None
+    header = content[:content.index(b"\n") + 1]
+    new_df = pd.read_csv(io.BytesIO(header + content[size:]))
+
+    return new_df if len(new_df) else None
+
+
+def interpolateGroups(data, groupKeys, orderKey):
+    # linearly interpolate the missing numeric values within each group and fill the ends of a group from its
+    # nearest value; matches running interpolate(method="linear").ffill().bfill() on every group separately,
+    # but works on all groups at once so it scales to thousands of groups (e.g. ["state", "county"] keys or a
+    # monthly order key)
+    data = data.sort_values(groupKeys + [orderKey], kind="stable")
+    columns = data.select_dtypes("number").columns
+    values = data[columns]
+    groupIds = data.groupby(groupKeys, sort=False).ngroup().to_numpy()
+
+    # position of the nearest known value before and after every row, within its group
+    known = values.notna().to_numpy()
+    rowPos = np.arange(len(data), dtype="float64")[:, None]
+    knownPos = pd.DataFrame(np.where(known, rowPos, np.nan), index=values.index, columns=columns)
+    prevPos = knownPos.groupby(groupIds).ffill()
+    nextPos = knownPos.groupby(groupIds).bfill()
+    prevVal = values.groupby(groupIds).ffill()
+    nextVal = values.groupby(groupIds).bfill()
+
+    # same arithmetic as np.interp, which is what pandas uses for a single group
+    slope = (nextVal - prevVal) / (nextPos - prevPos)
+    filled = slope * (rowPos - prevPos) + prevVal
+    filled = filled.where(nextPos.notna(), prevVal)  # trailing gaps take the last known value
+    filled = filled.where(prevPos.notna(), nextVal)  # leading gaps take the first known value
+    filled = filled.where(~known, values)
+
+    result = data.copy()
+    result[columns] = filled.astype(values.dtypes.to_dict())
+    return result
+
+
+def prepareData(raw_df, regions):
+    # data preprocessing ------
+    df = raw_df.merge(regions[["State", "Region"]], left_on="state", right_on="State")
+    df = df.drop("State", axis=1).sort_values(by=["year", "state"])
+    df.columns = df.columns.str.replace("_", " ")
+    df.columns = df.columns.str.lower()
+    df["new count"] = df["initial count"] - df["lost"]
+    df["end count"] = df["initial count"] - df["lost"] + df["added"] + df["renovated"]
+
+    return df
+
+
+def fillMissing(df):
+    # linear interpolation ------
+    miss_df = df.loc[:, ~df.columns.isin(DERIVED)]
+    result_df = interpolateGroups(miss_df, ["state"], "period").reset_index(drop=True)
+
+    return deriveColumns(result_df, df)
+
+
+def deriveColumns(result_df, df):
+    # add back lost/renovated perc columns
+    linear_df = pd.merge(result_df, df[["state", "period", "lost perc", "renovated perc"]],
+                         on=["state", "period"], how="left")
+    # fill in the missing lost/renovated perc values and
+    linear_df["lost perc"] = linear_df["lost perc"].fillna(round(result_df["lost"] / result_df["initial count"] * 100))
+    linear_df["renovated perc"] = linear_df["renovated perc"].fillna(
+        round(result_df["renovated"] / result_df["initial count"] * 100))
+    linear_df["new count"] = result_df["initial count"] - result_df["lost"]
+    linear_df["end count"] = result_df["initial count"] - result_df["lost"] + result_df["added"] + result_df["renovated"]
+
+    # round remaining columns
+    linear_df[STRESSORS] = linear_df[STRESSORS].round(2)
+    linear_df[COUNTS] = linear_df[COUNTS].round()
+
+    return linear_df
+
+
+def ingestQuarter(df, linear_df, raw_df, regions):
+    # append the rows of a new release to an already filled dataset; each affected state is only interpolated
+    # again from its last old row without missing values, since nothing before that row can change, so the
+    # result is the same as a full rebuild
+    new_df = prepareData(raw_df, regions)
+    if len(new_df.merge(df[["state", "period"]], on=["state", "period"])) > 0:
+        raise ValueError("release contains periods that are already loaded")
+    df = pd.concat([df, new_df]).sort_values(by=["year", "state"])
+
+    byState_df = df.sort_values(["state", "period"]).reset_index(drop=True)
+    keys = pd.MultiIndex.from_frame(byState_df[["state", "period"]])
+    isNew = keys.isin(pd.MultiIndex.from_frame(new_df[["state", "period"]]))
+    affected = byState_df["state"].isin(new_df["state"]).to_numpy()
+    complete = byState_df.loc[:, ~byState_df.columns.isin(DERIVED)].select_dtypes("number").notna().all(axis=1)
+
+    # segment start: last complete old row of the state, or its first row if it has none
+    rowPos = pd.Series(np.arange(len(byState_df)))
+    firstPos = rowPos - byState_df.groupby("state").cumcount()
+    anchorPos = rowPos.where(complete & ~isNew).groupby(byState_df["state"]).transform("max")
+    segment = affected & (rowPos >= anchorPos.fillna(firstPos)).to_numpy()
+
+    changed_df = fillMissing(byState_df[segment])
+    kept_df = linear_df[~pd.MultiIndex.from_frame(linear_df[["state", "period"]]).isin(keys[segment])]
+    linear_df = pd.concat([kept_df, changed_df]).sort_values(["state", "period"], kind="stable")
+
+    return df, linear_df.reset_index(drop=True), changed_df
+
+
+def compactFrame(data):
+    # compact form of a colony frame, as the app keeps it: categorical keys, a quarterly period, float32 percentages
+    # and int32 counts (nullable Int32 while they still have gaps); expandFrame gives back the plain frame
+    types = {col: "category" for col in CATEGORIES if col in data}
+    types.update({col: "float32" for col in PERCENTAGES if col in data})
+    if "year" in data:
+        types["year"] = "int16"
+    data = data.astype(types)
+    for col in [col for col in COLONY_COUNTS if col in data]:
+        data[col] = data[col].round().astype("int32" if data[col].notna().all() else "Int32")
+    if "period" in data and not isinstance(data["period"].dtype, pd.PeriodDtype):
+        # parse every distinct period once
+        codes, periods = pd.factorize(data["period"])
+        data["period"] = pd.PeriodIndex(periods, freq="Q")[codes]
+
+    return data
+
+
+def expandFrame(data):
+    # plain dtypes of a compact frame, the ones the pipeline, plotly and the t-tests work with: string keys and
+    # periods and float64 numbers; float32 values are rounded to FLOAT32_DECIMALS, which restores the exact
+    # float64 values they were stored from
+    types, keys = {}, []
+    for col, dtype in data.dtypes.items():
+        if isinstance(dtype, (pd.CategoricalDtype, pd.PeriodDtype)):
+            keys.append(col)
+        elif col in COLONY_COUNTS or pd.api.types.is_float_dtype(dtype):
+            types[col] = "float64"
+        elif pd.api.types.is_integer_dtype(dtype):
+            types[col] = "int64"
+    narrow = [col for col, dtype in data.dtypes.items() if dtype == "float32"]
+    data = data.astype(types)
+    data[narrow] = data[narrow].round(FLOAT32_DECIMALS)
+    for col in keys:
+        # format every distinct key once
+        codes, uniques = pd.factorize(data[col])
+        data[col] = uniques.astype(str).to_numpy(dtype=object).take(codes)
+
+    return data
+
+
+def readOnly(data):
+    # make the arrays behind a frame or series read-only, including those inside categorical, period and nullable
+    # columns, so that code writing into a frame shared between sessions fails instead of changing it for everyone;
+    # object arrays (plain strings) stay writeable, pandas cannot compare them otherwise
+    for block in data._mgr.blocks:
+        values = block.values
+        arrays = [values] if isinstance(values, np.ndarray) else \
+            [getattr(values, name, None) for name in ["_ndarray", "_codes", "_data", "_mask"]]
+        for array in arrays:
+            if isinstance(array, np.ndarray) and array.dtype != object:
+                array.flags.writeable = False
+
+    return data
+
+
+def sliceIndex(data):
+    # sort the rows by region, state and period so that every region and every state is one contiguous block of
+    # rows, and map each of them, in alphabetical order, to its (start, stop) row range; periods are kept as quarter
+    # ordinals
+    frame = data.sort_values(["region", "state", "period"], kind="stable").reset_index(drop=True)
+    periods = pd.PeriodIndex(frame["period"], freq="Q")
+    index = {"frame": frame, "periods": periods.asi8, "all periods": list(periods.unique().sort_values().astype(str))}
+    for key in ["region", "state"]:
+        values = frame[key].to_numpy()
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        stops = np.r_[starts[1:], len(frame)]
+        index[key] = dict(sorted(zip(values[starts], zip(starts, stops))))
+
+    return index
+
+
+def sliceRows(index, key, value, periodRange=None):
+    # rows of a state or region as a slice of the index frame, without scanning it; periodRange (start, end)
+    # narrows the rows of a state to those periods
+    start, stop = index[key].get(value, (0, 0))
+    if periodRange is not None:
+        periods = index["periods"][start:stop]
+        first, last = (pd.Period(period, freq="Q").ordinal for period in periodRange)
+        start, stop = start + np.searchsorted(periods, first, side="left"), \
+            start + np.searchsorted(periods, last, side="right")
+
+    return index["frame"].iloc[start:stop]
@@ -0,0 +1,85 @@
+# downsampling of long line chart series to a point budget before the figure is built, keeping their visual shape;
+# every series of a chart is handled at once, the loops only run over the buckets
+import numpy as np
+import pandas as pd
+
+from honeybees.instrument import timedStage
+
+POINT_BUDGET = 400  # points per series of a line chart
+DOWNSAMPLING = ["lttb", "minmax"]
+
+
+def lttbPositions(values, budget):
+    # positions Largest-Triangle-Three-Buckets keeps in every column of values (points x series, equally spaced
+    # x): the first and last point and, from each of budget - 2 buckets, the point spanning the largest triangle
+    # with the point kept before it and the mean of the next bucket; missing values are never picked
+    n, k = values.shape
+    if n <= budget:
+        return np.repeat(np.arange(n)[:, None], k, axis=1)
+    budget = max(budget, 3)
+    edges = np.r_[np.linspace(1, n - 1, budget - 1).astype(int), n]
+    series = np.arange(k)
+    kept = np.empty((budget, k), dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    for bucket in range(budget - 2):
+        start, stop, nextStop = edges[bucket], edges[bucket + 1], edges[bucket + 2]
+        # mean point of the next bucket, or the last point for the last bucket
+        nextX = (stop + nextStop - 1) / 2
+        known = ~np.isnan(values[stop:nextStop])
+        counts = known.sum(axis=0)
+        nextY = np.where(known, values[stop:nextStop], 0).sum(axis=0) / np.maximum(counts, 1)
+        nextY[counts == 0] = np.nan
+        prevX, prevY = kept[bucket], values[kept[bucket], series]
+        x = np.arange(start, stop)[:, None]
+        area = np.abs((prevX - nextX) * (values[start:stop] - prevY) - (prevX - x) * (nextY - prevY))
+        kept[bucket + 1] = start + np.where(np.isnan(area), -1, area).argmax(axis=0)
+
+    return kept
+
+
+def minMaxPositions(values, budget):
+    # positions of the lowest and highest value of every column of values (points x series) in each of budget / 2
+    # equal buckets, in order; missing values are never picked
+    n, k = values.shape
+    if n <= budget:
+        return np.repeat(np.arange(n)[:, None], k, axis=1)
+    edges = np.linspace(0, n, max(budget // 2, 1) + 1).astype(int)
+    kept = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        bucket = values[start:stop]
+        kept.append(start + np.where(np.isnan(bucket), np.inf, bucket).argmin(axis=0))
+        kept.append(start + np.where(np.isnan(bucket), -np.inf, bucket).argmax(axis=0))
+
+    return np.sort(np.array(kept), axis=0)
+
+
+@timedStage("downsample")
+def downsampleRows(data, columns, budget=POINT_BUDGET, groupKey=None, method="lttb"):
+    # rows of data to plot so that no series has more than `budget` points; a series is a column of `columns`
+    # within one group of contiguous rows ordered by x (the whole frame without groupKey). The rows a series keeps
+    # are kept for all columns, and rows with a missing value are kept so the gaps stay visible; data is returned
+    # as it is when every series fits the budget
+    if method not in DOWNSAMPLING:
+        raise ValueError(f"unknown downsampling method {method!r}")
+    codes = np.zeros(len(data), dtype=int) if groupKey is None else pd.factorize(data[groupKey])[0]
+    position = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    if len(data) == 0 or position.max() < budget:
+        return data
+
+    # one column per group and variable, padded with missing values after the end of shorter groups
+    groups, width = codes.max() + 1, len(columns)
+    rowOf = np.full((position.max() + 1, groups), -1)
+    rowOf[position, codes] = np.arange(len(data))
+    values = np.full((position.max() + 1, groups * width), np.nan)
+    for j, col in enumerate(columns):
+        values[position, codes * width + j] = data[col].to_numpy(dtype="float64", na_value=np.nan)
+
+    # series of the same length share their buckets, so usually all of them are downsampled in one pass
+    lengths = np.repeat(np.bincount(codes), width)
+    keep = data[columns].isna().any(axis=1).to_numpy()
+    for length in np.unique(lengths):
+        series = np.flatnonzero(lengths == length)
+        positions = (lttbPositions if method == "lttb" else minMaxPositions)(values[:length, series], budget)
+        keep[rowOf[positions, series // width]] = True
+
+    return data[keep]
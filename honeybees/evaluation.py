@@ -0,0 +1,109 @@
+# how well each interpolation method recovers known colony values that are masked out, scored per state and
+# column; groups of states are spread over a process pool so it stays fast with thousands of series
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from honeybees.data import STRESSORS
+
+METHODS = ["linear", "time", "spline", "seasonal naive", "ffill"]
+EVAL_COLUMNS = STRESSORS + ["initial count", "max", "lost", "added", "renovated"]
+MASK_SHARE = 0.1
+SPLINE_ORDER = 3
+
+
+def maskValues(data, share=MASK_SHARE, seed=0):
+    # copy of data with a random share of the known values of every evaluated column blanked out
+    rng = np.random.default_rng(seed)
+    known = data[EVAL_COLUMNS].notna().to_numpy()
+    masked_df = data.copy()
+    masked_df[EVAL_COLUMNS] = data[EVAL_COLUMNS].mask(known & (rng.random(known.shape) < share))
+
+    return masked_df
+
+
+def fillValues(values, method):
+    # fill the gaps of a frame with a row per consecutive quarter (indexed by the quarter start) and a column per
+    # series; gaps at either end take the nearest value, like the app's linear interpolation
+    if method == "linear":
+        filled = values.interpolate(method="linear")
+    elif method == "time":
+        filled = values.interpolate(method="time")
+    elif method == "spline":
+        # a cubic spline needs more known points than its order, otherwise the series stays linear
+        filled = values.interpolate(method="linear")
+        enough = values.notna().sum().to_numpy() > SPLINE_ORDER
+        if enough.any():
+            numeric = values.iloc[:, enough].set_axis(np.arange(len(values)))
+            # only between known values: the spline would extrapolate the gaps at the ends, which take the nearest
+            # value below as with the other methods
+            filled.iloc[:, enough] = numeric.interpolate(method="spline", order=SPLINE_ORDER, s=0,
+                                                         limit_area="inside").to_numpy()
+    elif method == "seasonal naive":
+        # same quarter of the year before, or of the year after, then linear
+        filled = values.fillna(values.shift(4)).fillna(values.shift(-4)).interpolate(method="linear")
+    elif method == "ffill":
+        filled = values.ffill()
+    else:
+        raise ValueError(f"unknown interpolation method {method!r}")
+
+    return filled.ffill().bfill()
+
+
+def scoreGroups(truth_df, masked_df, groupKey):
+    # mean absolute and root mean squared error of every method on the masked values, per group and column; one
+    # task of evaluateMethods, which fills all series of its groups at once as the columns of one wide frame
+    starts = pd.PeriodIndex(truth_df["period"], freq="Q").to_timestamp()
+    quarters = pd.date_range(starts.min(), starts.max(), freq="QS")
+    truth = truth_df.assign(start=starts).pivot(index="start", columns=groupKey, values=EVAL_COLUMNS)
+    values = masked_df.assign(start=starts).pivot(index="start", columns=groupKey, values=EVAL_COLUMNS)
+    truth, values = truth.reindex(quarters), values.reindex(quarters)
+    hidden = truth.notna() & values.isna()
+
+    scores = []
+    for method in METHODS:
+        error = (fillValues(values, method) - truth).where(hidden)
+        scores.append(pd.DataFrame({groupKey: error.columns.get_level_values(1),
+                                    "column": error.columns.get_level_values(0),
+                                    "method": method,
+                                    "masked": hidden.sum().to_numpy(),
+                                    "mae": error.abs().mean().to_numpy(),
+                                    "rmse": np.sqrt((error ** 2).mean()).to_numpy()}))
+
+    return pd.concat(scores, ignore_index=True)
+
+
+def evaluateMethods(data, groupKey="state", workers=None, share=MASK_SHARE, seed=0):
+    # mask a share of the known values of the (not yet interpolated) data, fill them with every method and score
+    # them per group and column; the groups are split into a few tasks per worker process, workers=1 runs them
+    # in this process
+    workers = workers or os.cpu_count() or 1
+    data = data.sort_values([groupKey, "period"], kind="stable").reset_index(drop=True)
+    masked_df = maskValues(data, share, seed)
+
+    groups = data[groupKey].unique()
+    chunks = [chunk for chunk in np.array_split(groups, min(len(groups), workers * 4)) if len(chunk)]
+    rows = [data[groupKey].isin(chunk).to_numpy() for chunk in chunks]
+    tasks = [(data[row], masked_df[row], groupKey) for row in rows]
+    if workers == 1:
+        results = [scoreGroups(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(scoreGroups, *zip(*tasks)))
+
+    return pd.concat(results).sort_values(groupKey, kind="stable").reset_index(drop=True)
+
+
+def methodSummary(scores_df):
+    # mean absolute error of every method per column, averaged over the groups by their number of masked values,
+    # with the method that recovers each column best
+    scored_df = scores_df[scores_df["masked"] > 0]
+    weighted = (scored_df["mae"] * scored_df["masked"]).groupby([scored_df["column"], scored_df["method"]]).sum()
+    summary_df = (weighted / scored_df.groupby(["column", "method"])["masked"].sum()).unstack()
+    summary_df = summary_df.reindex(index=[col for col in EVAL_COLUMNS if col in summary_df.index], columns=METHODS)
+    summary_df["best"] = summary_df[METHODS].idxmin(axis=1)
+    summary_df.columns.name = None
+
+    return summary_df.reset_index()
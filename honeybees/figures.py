@@ -0,0 +1,241 @@
+# plotly figures of the app; plotly is only imported once a figure is built, from the plain form of the compact
+# frames so axes, legends and hover text show the same strings and numbers as the source data
+import pandas as pd
+
+from honeybees.data import STRESSORS, codeVersion, expandFrame, sliceRows
+from honeybees.downsample import POINT_BUDGET, downsampleRows
+from honeybees.instrument import timedStage
+
+CUSTOMLABEL = {"font_size": 14, "font_family": "Calibri"}
+TRANSPARENT = 'rgba(0,0,0,0)'
+FRAME_STYLE = ["hovertemplate", "hoverlabel", "geo", "coloraxis", "locationmode", "name"]
+# hash of the modules the figures are built and forecast with, so figures cached on disk are built again whenever
+# one of them changes
+BUILDER_VERSION = codeVersion(["data", "downsample", "figures", "forecast"])[:12]
+
+
+@timedStage("figures.choropleth_map")
+def choropleth_map(data, stressorChoice):
+    # visualize % colonies destroyed given stressor across the country using a color scale
+    import plotly.express as px
+
+    # animation frames in period order, with the states of every frame in alphabetical order whatever the row order
+    rows_df = data[["state", "state code", "period", stressorChoice]].sort_values(["state", "period"], kind="stable")
+    fig1 = px.choropleth(expandFrame(rows_df),
+                         locations="state code",
+                         locationmode="USA-states",
+                         scope="usa",
+                         color=stressorChoice,
+                         color_continuous_scale="Viridis_r",
+                         animation_frame="period",
+                         template="seaborn",
+                         labels={stressorChoice: "% Destroyed"},
+                         custom_data=["state", stressorChoice])
+    # map appearance adjustments
+    customTemp = "<br>".join(["%{customdata[0]}", "%{customdata[1]} %"])
+    fig1.update_layout(title_text=f"Percentage of colonies destroyed by {stressorChoice}", title_x=0.5,
+                       paper_bgcolor=TRANSPARENT,
+                       geo=dict(bgcolor=TRANSPARENT))
+    fig1.update_traces(hovertemplate=customTemp, hoverlabel=CUSTOMLABEL)
+    # change hover text for each animation frame
+    compactFrames(fig1)
+
+    return fig1
+
+
+def compactFrames(fig):
+    # drop the styling every animation frame repeats; frame traces are merged into the base trace when a frame
+    # is shown, so the styling of the base trace applies to all frames and the figure payload gets smaller
+    for frame in fig.frames:
+        for trace in frame.data:
+            for prop in FRAME_STYLE:
+                trace[prop] = None
+
+    return fig
+
+
+def forecastStart(state_df, forecast_df):
+    # last row of a state's data when its forecast continues right after it, otherwise None (e.g. for a custom
+    # time frame that ends earlier)
+    if forecast_df is None or len(state_df) == 0 or len(forecast_df) == 0:
+        return None
+    last = expandFrame(state_df.iloc[-1:]).iloc[0]
+    if pd.Period(last["period"], freq="Q") + 1 != pd.Period(forecast_df["period"].iloc[0], freq="Q"):
+        return None
+
+    return last
+
+
+def forecastLines(fig, last, forecast_df, columns, colors):
+    # dashed extension of the line of every column from its last known point through the forecast quarters, in
+    # the legend group of the line so both are shown and hidden together
+    for col, color in zip(columns, colors):
+        fig.add_scatter(x=[last["period"], *forecast_df["period"]], y=[last[col], *forecast_df[col]],
+                        mode="lines", line={"color": color, "dash": "dash"}, name=f"{col} (forecast)",
+                        legendgroup=col, showlegend=False, hoverlabel=CUSTOMLABEL)
+
+    return fig
+
+
+@timedStage("figures.stressorComparison")
+def stressorComparison(index, stateChoice, pointBudget=POINT_BUDGET, forecast_df=None):
+    # comparison of % colonies destroyed across stressors within selected state
+    # can isolate each stressor by selecting in legend; pointBudget=None plots every point of a long history,
+    # forecast_df (forecastColonies) adds the forecast quarters of the state as dashed lines
+    import plotly.express as px
+
+    # one row per stressor and period, so that every stressor keeps its own points when downsampled
+    rows_df = sliceRows(index, "state", stateChoice)
+    state_df = rows_df.melt(id_vars=["period"], value_vars=STRESSORS, var_name="stressor", value_name="percentage")
+    if pointBudget:
+        state_df = downsampleRows(state_df, ["percentage"], pointBudget, groupKey="stressor")
+    fig1 = px.line(expandFrame(state_df),
+                   x="period",
+                   y="percentage",
+                   color="stressor",
+                   color_discrete_sequence=px.colors.qualitative.T10)
+    # line graph appearance adjustments
+    fig1.update_layout(title_text=f"Percentage of colonies destroyed across stressors in {stateChoice}",
+                       title_x=0.5, paper_bgcolor=TRANSPARENT,
+                       plot_bgcolor=TRANSPARENT)
+    fig1.update_xaxes(tickangle=40)
+    fig1.update_traces(hoverlabel=CUSTOMLABEL)
+    if forecast_df is not None:
+        state_forecast_df = forecast_df[forecast_df["state"] == stateChoice]
+        last = forecastStart(rows_df, state_forecast_df)
+        if last is not None:
+            forecastLines(fig1, last, state_forecast_df, STRESSORS, px.colors.qualitative.T10)
+
+    return fig1
+
+
+@timedStage("figures.countBars")
+def countBars(index, stateChoice, periodRange=None, forecast_df=None):
+    # comparison of colony numbers of initial counts to end count; forecast quarters are hatched bars
+    import plotly.express as px
+
+    rows_df = sliceRows(index, "state", stateChoice, periodRange=periodRange)
+    state_df = expandFrame(rows_df)
+    fig1 = px.bar(state_df,
+                  x="period",
+                  y=["initial count", "end count"],
+                  barmode="group",
+                  labels={"value": "number of colonies", "variable": "counts"},
+                  color_discrete_map={"initial count": "#714925", "end count": "#FFD220"})
+    fig1.update_layout(title_text=f"Initial vs. end colony population counts in {stateChoice}", title_x=0.5,
+                       paper_bgcolor=TRANSPARENT, plot_bgcolor=TRANSPARENT)
+    fig1.update_xaxes(tickangle=40)
+    fig1.update_traces(hoverlabel=CUSTOMLABEL)
+    if forecast_df is not None:
+        state_forecast_df = forecast_df[forecast_df["state"] == stateChoice]
+        if forecastStart(rows_df, state_forecast_df) is not None:
+            for col, color in [("initial count", "#714925"), ("end count", "#FFD220")]:
+                fig1.add_bar(x=state_forecast_df["period"], y=state_forecast_df[col], name=f"{col} (forecast)",
+                             marker={"color": color, "opacity": 0.5, "pattern": {"shape": "/"}},
+                             offsetgroup=col, legendgroup=col, showlegend=False, hoverlabel=CUSTOMLABEL)
+
+    return fig1
+
+
+@timedStage("figures.populationLines")
+def populationLines(index, stateChoice, periodRange=None, forecast_df=None):
+    # general colony population change
+    # new count used instead of lost to provide better comparison with initial and max; the initial count is
+    # the one of the three that is forecast
+    import plotly.express as px
+
+    rows_df = sliceRows(index, "state", stateChoice, periodRange=periodRange)
+    state_df = expandFrame(rows_df)
+    fig1 = px.line(state_df,
+                   x="period",
+                   y=["max", "initial count", "new count"],
+                   labels={"value": "number of colonies", "variable": "counts"},
+                   color_discrete_sequence=px.colors.qualitative.T10)
+    fig1.update_layout(title_text=f"Colony population change in {stateChoice}", title_x=0.5,
+                       paper_bgcolor=TRANSPARENT, plot_bgcolor=TRANSPARENT)
+    fig1.update_xaxes(tickangle=40)
+    fig1.update_traces(hoverlabel=CUSTOMLABEL)
+    if forecast_df is not None:
+        state_forecast_df = forecast_df[forecast_df["state"] == stateChoice]
+        last = forecastStart(rows_df, state_forecast_df)
+        if last is not None:
+            forecastLines(fig1, last, state_forecast_df, ["initial count"], px.colors.qualitative.T10[1:2])
+
+    return fig1
+
+
+@timedStage("figures.seasonalMap")
+def seasonalMap(seasonal_df):
+    # states with low counts in Q1 and high counts in Q3
+    import plotly.express as px
+
+    seasonal_states_df = seasonal_df[seasonal_df["seasonal"] == "yes"]
+    q13_df = seasonal_states_df[(seasonal_states_df["Q1"] == "low") & (seasonal_states_df["Q3"] == "high")]
+
+    fig1 = px.choropleth(q13_df,
+                         locations="state code",
+                         locationmode="USA-states",
+                         scope="usa",
+                         template="seaborn",
+                         custom_data=["state"],
+                         color_discrete_sequence=px.colors.qualitative.Plotly_r)
+
+    customTemp = "<br>".join(["%{customdata[0]}"])
+    fig1.update_layout(title_text=f"States with low counts in Q1 and high counts in Q3", title_x=0.5,
+                       paper_bgcolor=TRANSPARENT,
+                       geo=dict(bgcolor=TRANSPARENT))
+    fig1.update_traces(hovertemplate=customTemp, hoverlabel=CUSTOMLABEL)
+
+    return fig1
+
+
+@timedStage("figures.customLine")
+def customLine(index, locFilter, colChoice, pointBudget=POINT_BUDGET):
+    # % colonies destroyed by selected stressor for selected state(s); pointBudget=None plots every point of a
+    # long history
+    import plotly.express as px
+
+    customTemp = "%{customdata[0]}"
+    customTitle = ""
+    if colChoice in STRESSORS:
+        customTitle = f"Percentage of colonies destroyed by {colChoice} across states"
+        customTemp = "%{customdata[0]} %"
+    elif colChoice == "initial count":
+        customTitle = "Initial total count of colonies quarterly by state"
+    elif colChoice == "max":
+        customTitle = "Maximum amount of colonies recorded quarterly by state"
+    elif colChoice == "lost":
+        customTitle = "Total colonies lost quarterly by state"
+    elif colChoice == "lost perc":
+        customTitle = "Percentage of colonies lost from initial count quarterly by state"
+        customTemp = "%{customdata[0]} %"
+    elif colChoice == "added":
+        customTitle = f"Total colonies added quarterly by state"
+    elif colChoice == "renovated":
+        customTitle = "Total colonies renovated quarterly by state"
+    elif colChoice == "renovated perc":
+        customTitle = "Percentage of colonies renovated quarterly by state"
+        customTemp = "%{customdata[0]} %"
+
+    if isinstance(locFilter, str):
+        line_df = sliceRows(index, "region", locFilter)
+        customTitle = customTitle[:36] + colChoice + " in the " + locFilter
+    else:
+        # allow column selection paired with stateChoice multiselect for user-select parameter comparisons
+        state_dfs = [sliceRows(index, "state", state) for state in sorted(locFilter)]
+        line_df = pd.concat(state_dfs) if state_dfs else index["frame"].iloc[:0]
+    if pointBudget:
+        line_df = downsampleRows(line_df, [colChoice], pointBudget, groupKey="state")
+
+    fig1 = px.line(expandFrame(line_df),
+                   x="period",
+                   y=colChoice,
+                   color="state",
+                   custom_data=[colChoice])
+    # custom line graph appearance adjustments
+    fig1.update_layout(title_text=customTitle, title_x=0.5, paper_bgcolor=TRANSPARENT,
+                       plot_bgcolor=TRANSPARENT)
+    fig1.update_xaxes(tickangle=40)
+    fig1.update_traces(hovertemplate=customTemp, hoverlabel=CUSTOMLABEL)
+
+    return fig1
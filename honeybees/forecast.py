@@ -0,0 +1,105 @@
+# forecasts of the colony counts and stressor rates of every state for the next quarters, by additive Holt-Winters
+# smoothing of all series at once (of the logarithm of the counts, which makes their seasonality multiplicative):
+# the loop runs over the quarters, and every step updates all states, columns and candidate smoothing parameters
+# together as one array
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from honeybees.data import STRESSORS
+
+FORECAST_COLUMNS = ["initial count", "end count"] + STRESSORS
+FORECAST_QUARTERS = 4
+SEASON = 4  # quarters per seasonal cycle
+# smoothing parameters tried for every series (level, trend, season); each series keeps the combination with the
+# smallest one-step-ahead error over its history
+ALPHAS = [0.2, 0.6]
+BETAS = [0.0, 0.1]
+GAMMAS = [0.1, 0.4]
+
+
+def seriesMatrix(data, columns, groupKey="state"):
+    # values of every group and column as a (quarters x series) matrix over consecutive quarters, the columns of a
+    # group next to each other and quarters without a row missing; with the groups and the ordinal of the last
+    # quarter
+    ordinals = pd.PeriodIndex(data["period"], freq="Q").asi8
+    codes, groups = pd.factorize(data[groupKey], sort=True)
+    rows = ordinals - ordinals.min()
+    values = np.full((rows.max() + 1, len(groups), len(columns)), np.nan)
+    values[rows, codes] = np.column_stack([data[col].to_numpy(dtype="float64", na_value=np.nan) for col in columns])
+
+    return values.reshape(len(values), -1), np.asarray(groups), ordinals.max()
+
+
+def knownMean(values):
+    # mean of the known values of every column, missing where a column has none
+    known = ~np.isnan(values)
+    counts = known.sum(axis=0)
+    means = np.where(known, values, 0).sum(axis=0) / np.maximum(counts, 1)
+    means[counts == 0] = np.nan
+
+    return means
+
+
+def holtWinters(values, quarters=FORECAST_QUARTERS):
+    # additive Holt-Winters forecasts of the next quarters of every column of values (quarters x series), as a
+    # (quarters ahead x series) array; the level, trend and season start from the first two years, and missing
+    # values leave them as they are
+    params = np.array(list(itertools.product(ALPHAS, BETAS, GAMMAS)))
+    alpha, alphaBeta, gamma = params[:, [0]], params[:, [0]] * params[:, [1]], params[:, [2]]
+    n, width = values.shape
+    series = np.arange(width)
+
+    first = knownMean(values[:SEASON])
+    first = np.where(np.isnan(first), knownMean(values), first)
+    second = knownMean(values[SEASON:2 * SEASON])
+    shape = (len(params), width)
+    level = np.broadcast_to(first, shape).copy()
+    trend = np.broadcast_to(np.nan_to_num((second - first) / SEASON), shape).copy()
+    season = np.zeros((SEASON,) + shape)
+    season[:n] = np.nan_to_num(values[:SEASON] - first)[:, None, :]
+    squared, error, step = np.zeros(shape), np.empty(shape), np.empty(shape)
+
+    # one-step-ahead error of every quarter, updated in place as the arrays hold every series and parameter set
+    missing = np.isnan(values)
+    for t in range(n):
+        np.subtract(values[t], level, out=error)
+        error -= trend
+        error -= season[t % SEASON]
+        error[:, missing[t]] = 0
+        squared += np.multiply(error, error, out=step)
+        level += trend
+        level += np.multiply(alpha, error, out=step)
+        trend += np.multiply(alphaBeta, error, out=step)
+        season[t % SEASON] += np.multiply(gamma, error, out=step)
+
+    best = squared.argmin(axis=0)
+    level, trend, season = level[best, series], trend[best, series], season[:, best, series]
+    ahead = np.arange(1, quarters + 1)[:, None]
+
+    return level + ahead * trend + season[(n + ahead[:, 0] - 1) % SEASON]
+
+
+def forecastColonies(data, quarters=FORECAST_QUARTERS, columns=FORECAST_COLUMNS, groupKey="state"):
+    # forecast of the next quarters after the last period of the (filled) data for every group, one row per group
+    # and quarter in the plain form of the source data, rounded like the filled data; percentages stay within 0-100
+    values, groups, last = seriesMatrix(data, columns, groupKey)
+    # the seasonal swings of the counts grow with their level, so they are fitted in log space, which also keeps
+    # their forecasts positive; a count below zero is a data error and is taken as none
+    counts = np.tile([col not in STRESSORS for col in columns], len(groups))
+    values[:, counts] = np.log1p(np.maximum(values[:, counts], 0))
+    forecasts = holtWinters(values, quarters)
+    forecasts[:, counts] = np.expm1(forecasts[:, counts])
+    periods = pd.period_range(pd.Period(ordinal=last + 1, freq="Q"), periods=quarters, freq="Q").astype(str)
+
+    forecast_df = pd.DataFrame({groupKey: np.repeat(groups, quarters), "period": np.tile(np.asarray(periods),
+                                                                                         len(groups))})
+    forecasts = forecasts.reshape(quarters, len(groups), len(columns)).transpose(1, 0, 2).reshape(-1, len(columns))
+    for j, col in enumerate(columns):
+        if col in STRESSORS:
+            forecast_df[col] = forecasts[:, j].clip(0, 100).round(2)
+        else:
+            forecast_df[col] = forecasts[:, j].round()
+
+    return forecast_df
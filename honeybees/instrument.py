@@ -0,0 +1,92 @@
+# timing of the pipeline stages, figures and page functions of one run (e.g. a streamlit rerun), with figure
+# payload sizes and cache hits; kept per thread, so concurrent sessions do not mix, and appended as json lines to
+# HONEYBEES_TIMING_LOG when it is set. Nothing is recorded outside of a run started with startRun
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+TIMING_LOG = os.environ.get("HONEYBEES_TIMING_LOG")  # json lines file every finished run is appended to
+
+_local = threading.local()
+_lock = threading.Lock()
+_cacheCounts = {}  # stage: {"hit": n, "miss": n} over every run of the process
+
+
+def instrumenting():
+    # whether a run is being recorded in this thread, e.g. to only measure payload sizes then
+    return getattr(_local, "run", None) is not None
+
+
+def startRun(enabled=True, **context):
+    # start recording a run in this thread; context (e.g. the page) is added to every record of the run
+    _local.run = {"run": uuid.uuid4().hex[:12], "started": time.perf_counter(), **context} if enabled else None
+    _local.records, _local.stack = [], []
+
+
+@contextlib.contextmanager
+def timed(stage, **fields):
+    # time a block as a stage of the current run; yields its record so the block can add fields, e.g. bytes
+    if not instrumenting():
+        yield {}
+        return
+    record = {"stage": stage, "depth": len(_local.stack),
+              "start ms": (time.perf_counter() - _local.run["started"]) * 1000, **fields}
+    _local.stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["ms"] = (time.perf_counter() - start) * 1000
+        _local.stack.pop()
+        _local.records.append(record)
+        if "cache" in record:
+            with _lock:
+                counts = _cacheCounts.setdefault(stage, {"hit": 0, "miss": 0})
+                counts[record["cache"]] += 1
+
+
+def timedStage(stage, cached=False):
+    # decorator timing every call of a function as a stage; for a cached function (put it above the cache
+    # decorator) the call counts as a hit unless its body calls cacheMiss
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timed(stage, **({"cache": "hit"} if cached else {})):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def cacheMiss():
+    # mark the innermost cached stage as a miss; called first thing in the body of a cached function
+    if instrumenting() and _local.stack:
+        _local.stack[-1]["cache"] = "miss"
+
+
+def cacheCounts():
+    # cache hits and misses of every cached stage over every run of the process
+    with _lock:
+        return {stage: dict(counts) for stage, counts in _cacheCounts.items()}
+
+
+def finishRun(**context):
+    # stop recording the run of this thread; returns its records in start order, with a "run" record for the
+    # whole run first, and appends them to TIMING_LOG
+    if not instrumenting():
+        return []
+    run = dict(_local.run, **context)
+    total = {"stage": "run", "depth": -1, "start ms": 0.0, "ms": (time.perf_counter() - run.pop("started")) * 1000}
+    records = [total] + sorted(_local.records, key=lambda record: record["start ms"])
+    _local.run = None
+
+    if TIMING_LOG:
+        created = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with _lock, open(TIMING_LOG, "a") as f:
+            for record in records:
+                f.write(json.dumps({"time": created, **run, **record}) + "\n")
+
+    return records
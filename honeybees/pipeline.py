@@ -0,0 +1,166 @@
+# building the full dataset from the source files, and storing it as precomputed artifacts
+import io
+import json
+import os
+from collections.abc import Mapping
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from honeybees.data import COLONY_FILE, DATA_DIR, REGIONS_FILE, SEASONAL_FILE, appendedRows, codeVersion, \
+    compactFrame, dataVersion, expandFrame, fillMissing, ingestQuarter, prepareData, readOnly, sourceStamp
+from honeybees.instrument import timed, timedStage
+from honeybees.seasonal import seasonalTable
+from honeybees.stats import CUBE_STATS, GROUPINGS, aggregateCube, testFacts, updateCube
+
+ARTIFACT_DIR = os.environ.get("HONEYBEES_ARTIFACTS", os.path.join(DATA_DIR, "artifacts"))
+
+
+def buildDataset(version=None, previous=None):
+    # read the source files and build the compact filled frames, aggregate cube, test facts and seasonality table;
+    # when previous is a dataset whose colony file the current one only appends rows to, the new rows are ingested
+    # into it instead, unless they revise periods it already has. Only the size and hash of the colony file are
+    # kept, not its rows
+    version = version or dataVersion()
+    with timed("load"):
+        with open(COLONY_FILE, "rb") as f:
+            colony = f.read()
+        regions = pd.read_csv(REGIONS_FILE)
+
+    new_df = None
+    if previous and regions.equals(previous["regions"]):
+        new_df = appendedRows(colony, previous["source"])
+    ingested = None
+    if new_df is not None:
+        try:
+            with timed("ingestQuarter", rows=len(new_df)):
+                ingested = ingestQuarter(expandFrame(previous["df"]), expandFrame(previous["linear"]), new_df,
+                                         regions)
+        except ValueError:
+            # e.g. a re-issued quarter that is already loaded; the full build below handles the file as a whole
+            ingested = None
+    if ingested is not None:
+        df, linear_df, changed_df = ingested
+        with timed("compact"):
+            df, linear_df = compactFrame(df), compactFrame(linear_df)
+        with timed("updateCube"):
+            cube = updateCube(previous["cube"], linear_df, changed_df)
+    else:
+        with timed("merge"):
+            df = prepareData(pd.read_csv(io.BytesIO(colony)), regions)
+        with timed("interpolation"):
+            linear_df = fillMissing(df)
+        with timed("compact"):
+            df, linear_df = compactFrame(df), compactFrame(linear_df)
+        with timed("cube"):
+            cube = aggregateCube(linear_df)
+
+    with timed("seasonality"):
+        seasonal_df = seasonalTable(linear_df)
+    with timed("testFacts"):
+        facts_df = testFacts(linear_df, cube)
+
+    return {"version": version, "source": sourceStamp(colony), "regions": regions, "seasonal": seasonal_df,
+            "df": df, "linear": linear_df, "cube": cube, "facts": facts_df}
+
+
+def freezeDataset(dataset):
+    # read-only form of a dataset (or of any of its parts) to hold once per process and share between sessions:
+    # dicts become read-only mappings, lists tuples, and frames keep their arrays but can no longer be written to
+    if isinstance(dataset, dict):
+        return MappingProxyType({key: freezeDataset(value) for key, value in dataset.items()})
+    if isinstance(dataset, list):
+        return tuple(freezeDataset(value) for value in dataset)
+    if isinstance(dataset, (pd.DataFrame, pd.Series)):
+        return readOnly(dataset)
+    if isinstance(dataset, np.ndarray):
+        dataset.flags.writeable = False
+
+    return dataset
+
+
+def datasetView(dataset):
+    # view of a frozen dataset for one rerun: mappings become dicts and frames shallow copies of their own, so
+    # adding, replacing or dropping columns, inplace=True operations included, only changes the view, while
+    # writing into the shared arrays still raises
+    if isinstance(dataset, Mapping):
+        return {key: datasetView(value) for key, value in dataset.items()}
+    if isinstance(dataset, tuple):
+        return tuple(datasetView(value) for value in dataset)
+    if isinstance(dataset, (pd.DataFrame, pd.Series)):
+        return dataset.copy(deep=False)
+
+    return dataset
+
+
+def writeArtifacts(dataset, outDir=ARTIFACT_DIR):
+    # store the built frames, cube, facts and seasonality as feather files, with a manifest naming their data
+    # version, the version of the code that built them and the colony file
+    os.makedirs(outDir, exist_ok=True)
+    dataset["df"].reset_index(drop=True).to_feather(os.path.join(outDir, "df.feather"))
+    dataset["linear"].to_feather(os.path.join(outDir, "linear.feather"))
+    dataset["facts"].to_feather(os.path.join(outDir, "facts.feather"))
+    dataset["seasonal"].to_feather(os.path.join(outDir, "seasonal.feather"))
+    if "evaluation" in dataset:
+        dataset["evaluation"].to_feather(os.path.join(outDir, "evaluation.feather"))
+    for grouping in GROUPINGS:
+        # one long frame per grouping, with a stat column in front of the group
+        cube_df = pd.concat(dataset["cube"][grouping], names=["stat"]).reset_index()
+        cube_df.to_feather(os.path.join(outDir, f"cube-{grouping}.feather"))
+
+    with open(os.path.join(outDir, "manifest.json"), "w") as f:
+        json.dump({"version": dataset["version"], "code": codeVersion(), "source": dataset["source"]}, f)
+
+
+def readManifest(outDir=ARTIFACT_DIR):
+    # manifest of the artifacts in outDir, or None when there are none or the current code did not build them
+    try:
+        with open(os.path.join(outDir, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest["code"] != codeVersion():
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return manifest
+
+
+def artifactVersion(outDir=ARTIFACT_DIR):
+    # data version named by the manifest of the artifacts in outDir, or None when there are none or they were
+    # built by other code
+    manifest = readManifest(outDir)
+    return manifest and manifest["version"]
+
+
+@timedStage("readArtifacts")
+def readArtifacts(version, outDir=ARTIFACT_DIR):
+    # dataset from precomputed artifacts, or None when there are none for this data version and the current code;
+    # includes the interpolation method scores when they were evaluated too
+    manifest = readManifest(outDir)
+    if manifest is None or manifest.get("version") != version:
+        return None
+
+    regions = pd.read_csv(REGIONS_FILE)
+    cube = {}
+    for grouping in GROUPINGS:
+        cube_df = pd.read_feather(os.path.join(outDir, f"cube-{grouping}.feather")).set_index(["stat", grouping])
+        cube[grouping] = {stat: cube_df.loc[stat] for stat in CUBE_STATS}
+        cube[grouping]["count"] = cube[grouping]["count"].astype("int64")  # shares a column with the float stats
+
+    dataset = {"version": version, "source": manifest["source"], "regions": regions,
+               "seasonal": pd.read_feather(os.path.join(outDir, "seasonal.feather")),
+               "df": pd.read_feather(os.path.join(outDir, "df.feather")),
+               "linear": pd.read_feather(os.path.join(outDir, "linear.feather")),
+               "cube": cube, "facts": pd.read_feather(os.path.join(outDir, "facts.feather"))}
+    if os.path.exists(os.path.join(outDir, "evaluation.feather")):
+        dataset["evaluation"] = pd.read_feather(os.path.join(outDir, "evaluation.feather"))
+
+    return dataset
+
+
+def exportCsv(dataset):
+    # rewrite the csv snapshots of the filled data, the test facts and the seasonality kept next to the source files
+    expandFrame(dataset["linear"]).to_csv(os.path.join(DATA_DIR, "filled_colony_data.csv"), index=False)
+    dataset["facts"].to_csv(os.path.join(DATA_DIR, "test_facts.csv"), index=False)
+    dataset["seasonal"].to_csv(SEASONAL_FILE, index=False)
@@ -0,0 +1,63 @@
+# quarterly seasonality of the colony counts, detected for every state at once (schema of seasonal.csv)
+import numpy as np
+import pandas as pd
+
+QUARTERS = ["Q1", "Q2", "Q3", "Q4"]
+SEASONAL_COUNT = "new count"  # count the seasonal map describes
+# thresholds on the strength and amplitude of the profiles, each picked as the value that agrees best with its own
+# label in the hand-built seasonal.csv the table replaced (44 states, 2015-2020): the high/low marks then agree on
+# 152 of 176 state quarters, possible on 37 and seasonal on 39 of 44 states (amplitude 0.4 ties with 0.5), and 26
+# states match on every label
+MARK_STRENGTH = 0.4  # peak and trough quarters are marked high and low from this seasonal strength on
+POSSIBLE_STRENGTH = 0.65
+SEASONAL_STRENGTH = 0.8
+SEASONAL_AMPLITUDE = 0.5  # peak to trough swing as a share of the yearly level
+
+
+def seasonalProfiles(data, column=SEASONAL_COUNT, groupKey="state"):
+    # quarterly profile of a count for every group: the mean deviation of each quarter from the group's level in
+    # that year, relative so that small and large states compare; with the seasonal strength (share of the
+    # detrended variance the profile explains), the peak to trough amplitude and the peak and trough quarters
+    groups = data[groupKey]
+    values = data[column].astype("float64")
+    level = values.groupby([groups, data["year"]], observed=True).transform("mean")
+    deviation = (values / level - 1).where(level > 0, 0.0)
+
+    profile_df = deviation.groupby([groups, data["quarter"]], observed=True).mean().unstack()
+    profile_df = profile_df.reindex(columns=QUARTERS)
+    profile_df = profile_df.sub(profile_df.mean(axis=1), axis=0)
+    profile_df.columns.name = None
+
+    # profile value of every row's own quarter, and what the profile leaves unexplained
+    rows = profile_df.index.get_indexer(groups)
+    cols = profile_df.columns.get_indexer(data["quarter"])
+    residual = deviation - profile_df.to_numpy()[rows, cols]
+    total = (deviation ** 2).groupby(groups, observed=True).sum()
+    unexplained = (residual ** 2).groupby(groups, observed=True).sum()
+
+    profile_df["strength"] = (1 - unexplained / total).fillna(0).clip(lower=0)
+    profile_df["amplitude"] = profile_df[QUARTERS].max(axis=1) - profile_df[QUARTERS].min(axis=1)
+    profile_df["peak"] = profile_df[QUARTERS].idxmax(axis=1)
+    profile_df["trough"] = profile_df[QUARTERS].idxmin(axis=1)
+
+    return profile_df.sort_index()
+
+
+def seasonalTable(data, column=SEASONAL_COUNT, groupKey="state"):
+    # high and low marks on the peak and trough quarters, whether a state is possibly seasonal (y/n) and whether
+    # it is clearly seasonal (yes), with its state code for the map; same schema as the hand-built seasonal.csv
+    profile_df = seasonalProfiles(data, column, groupKey)
+    marked = (profile_df["strength"] >= MARK_STRENGTH).to_numpy()
+    seasonal = (profile_df["strength"] >= SEASONAL_STRENGTH) & (profile_df["amplitude"] >= SEASONAL_AMPLITUDE)
+    codes = data.groupby(groupKey, observed=True)["state code"].first()
+
+    table_df = pd.DataFrame({groupKey: np.asarray(profile_df.index)})
+    for quarter in QUARTERS:
+        table_df[quarter] = np.select([marked & (profile_df["peak"] == quarter).to_numpy(),
+                                       marked & (profile_df["trough"] == quarter).to_numpy()],
+                                      ["high", "low"], None)
+    table_df["possible"] = np.where(profile_df["strength"] >= POSSIBLE_STRENGTH, "y", "n")
+    table_df["seasonal"] = np.where(seasonal, "yes", None)
+    table_df["state code"] = np.asarray(codes.reindex(profile_df.index))
+
+    return table_df
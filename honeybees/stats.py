@@ -0,0 +1,108 @@
+# summary statistics, significance tests and derived facts of the filled colony data
+import numpy as np
+import pandas as pd
+
+from honeybees.data import COUNTS, STRESSORS, expandFrame
+
+GROUPINGS = ["state", "region", "quarter", "year"]
+CUBE_STATS = ["mean", "min", "max", "count", "std"]
+ALPHA = 0.05
+
+
+def aggregateCube(data):
+    # summary statistics of every stressor and count column by state, region, quarter and year, computed in float64;
+    # cube[grouping][stat] is a frame indexed by the group with one column per variable
+    cube = {}
+    for grouping in GROUPINGS:
+        agg_df = expandFrame(data[STRESSORS + COUNTS]).groupby(data[grouping], observed=True).agg(CUBE_STATS)
+        agg_df = agg_df.sort_index()  # observed categorical groups come in order of appearance
+        cube[grouping] = {stat: agg_df.xs(stat, axis=1, level=1) for stat in CUBE_STATS}
+
+    return cube
+
+
+def updateCube(cube, data, changed_df):
+    # recompute only the groups that contain changed rows and keep the rest of the cube as it is
+    updated = {}
+    for grouping in GROUPINGS:
+        groups = changed_df[grouping].unique()
+        group_df = data[data[grouping].isin(groups)]
+        agg_df = expandFrame(group_df[STRESSORS + COUNTS]).groupby(group_df[grouping], observed=True).agg(CUBE_STATS)
+        updated[grouping] = {}
+        for stat in CUBE_STATS:
+            stat_df = cube[grouping][stat]
+            stat_df = pd.concat([stat_df[~stat_df.index.isin(groups)], agg_df.xs(stat, axis=1, level=1)])
+            updated[grouping][stat] = stat_df.sort_index()
+
+    return updated
+
+
+def significanceTests(data, cube, grouping, equalVariances=False):
+    # t-test of each group's values against the overall values, for every stressor and group at once; Welch's test
+    # by default, equalVariances=True gives the pooled (Student) test
+    from scipy import stats
+
+    n1 = cube[grouping]["count"][STRESSORS].to_numpy()
+    m1 = cube[grouping]["mean"][STRESSORS].to_numpy()
+    v1 = cube[grouping]["std"][STRESSORS].to_numpy() ** 2
+    overall_df = expandFrame(data[STRESSORS]).agg(["count", "mean", "var"])
+    n2, m2, v2 = (overall_df.loc[stat].to_numpy() for stat in ["count", "mean", "var"])
+
+    pooledVar = ((n1 - 1) * v1 + (n2 - 1) * v2) / (n1 + n2 - 2)
+    if equalVariances:
+        stdErr = np.sqrt(pooledVar * (1 / n1 + 1 / n2))
+        dof = n1 + n2 - 2
+    else:
+        stdErr = np.sqrt(v1 / n1 + v2 / n2)
+        dof = stdErr ** 4 / ((v1 / n1) ** 2 / (n1 - 1) + (v2 / n2) ** 2 / (n2 - 1))
+    tStat = (m1 - m2) / stdErr
+    pValue = 2 * stats.t.sf(np.abs(tStat), dof)
+
+    # one row per group and stressor
+    groups = cube[grouping]["mean"].index
+    tests_df = pd.DataFrame({grouping: np.repeat(np.asarray(groups), len(STRESSORS)),
+                             "stressor": np.tile(STRESSORS, len(groups)),
+                             "mean": m1.ravel(),
+                             "overall mean": np.tile(m2, len(groups)),
+                             "difference": (m1 - m2).ravel(),
+                             "t": tStat.ravel(),
+                             "df": np.broadcast_to(dof, tStat.shape).ravel(),
+                             "p value": pValue.ravel(),
+                             "cohen d": ((m1 - m2) / np.sqrt(pooledVar)).ravel()})
+    tests_df["result"] = np.where(tests_df["p value"] < ALPHA, "reject", "fail")
+
+    return tests_df
+
+
+def endCountShares(data, grouping):
+    # percentage of quarters with an end count higher than the initial count, for every group at once
+    restored = data["end count"] > data["initial count"]
+    shares = restored.groupby(data[grouping], observed=True).mean().sort_index() * 100
+
+    return shares.rename("percentage")
+
+
+def effectFact(tests_df, grouping, stressor):
+    # sentence describing the significant group differences of a stressor, e.g. for the quarter and region facts
+    sig_df = tests_df[(tests_df["stressor"] == stressor) & (tests_df["result"] == "reject")]
+    if sig_df.empty:
+        effect = "quarterly" if grouping == "quarter" else "regional"
+        return f"No significant {effect} effect on average % of bee colonies destroyed was observed"
+
+    changes = []
+    for direction, dir_df in [("decreases", sig_df[sig_df["difference"] < 0]),
+                              ("increases", sig_df[sig_df["difference"] >= 0])]:
+        if not dir_df.empty:
+            labels = dir_df[grouping] if grouping == "quarter" else "the " + dir_df[grouping]
+            amounts = [f"{round(abs(diff), 1):g}% in {label}" for diff, label in zip(dir_df["difference"], labels)]
+            changes.append(f"{direction} by " + " and ".join(amounts))
+
+    return "Average % of colonies destroyed " + " and ".join(changes)
+
+
+def testFacts(data, cube):
+    # quarter and region facts for every stressor, derived from the significance tests (schema of test_facts.csv)
+    tests = {grouping: significanceTests(data, cube, grouping) for grouping in ["quarter", "region"]}
+    return pd.DataFrame({"stressor": STRESSORS,
+                         "quarter fact": [effectFact(tests["quarter"], "quarter", var) for var in STRESSORS],
+                         "region fact": [effectFact(tests["region"], "region", var) for var in STRESSORS]})
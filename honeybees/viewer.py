@@ -0,0 +1,102 @@
+# paged and filtered views of the index frames for the raw data tables: a selection is kept as row ranges of the
+# sorted index frame, so filtering never scans the rows and only the visible page (or one export chunk) is expanded
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from honeybees.data import expandFrame
+
+PAGE_SIZE = 50  # rows sent to the browser per page
+EXPORT_CHUNK = 100000  # rows expanded at a time when a selection is written to a file
+EXPORT_FORMATS = ["csv", "parquet"]
+
+
+def selectRanges(index, states=None, region=None, periodRange=None):
+    # (start, stop) row ranges of the index frame with the given states (all by default) within region (any by
+    # default), narrowed to the periods of periodRange (start, end); one range per state, in index order
+    spans = index["state"]
+    if states:
+        spans = {state: spans[state] for state in states if state in spans}
+    if region is not None:
+        first, last = index["region"].get(region, (0, 0))
+        spans = {state: (start, stop) for state, (start, stop) in spans.items() if first <= start < last}
+    ranges = np.array(sorted(spans.values()), dtype="int64").reshape(-1, 2)
+
+    if periodRange is not None:
+        # periods are sorted within the block of every state
+        first, last = (pd.Period(period, freq="Q").ordinal for period in periodRange)
+        periods = index["periods"]
+        for row, (start, stop) in enumerate(ranges):
+            ranges[row] = (start + np.searchsorted(periods[start:stop], first, side="left"),
+                           start + np.searchsorted(periods[start:stop], last, side="right"))
+        ranges = ranges[ranges[:, 1] > ranges[:, 0]]
+
+    return ranges
+
+
+def selectedRows(ranges):
+    # number of rows of a selection
+    return int((ranges[:, 1] - ranges[:, 0]).sum())
+
+
+def windowRows(index, ranges, start, stop):
+    # rows start:stop of a selection, in compact form; only the ranges overlapping the window are read
+    lengths = ranges[:, 1] - ranges[:, 0]
+    ends = np.cumsum(lengths)
+    begins = ends - lengths
+    parts = []
+    for row in range(np.searchsorted(ends, start, side="right"), np.searchsorted(begins, stop, side="left")):
+        first, last = max(start - begins[row], 0), min(stop - begins[row], lengths[row])
+        parts.append(index["frame"].iloc[ranges[row, 0] + first:ranges[row, 0] + last])
+
+    return pd.concat(parts) if parts else index["frame"].iloc[:0]
+
+
+def pageRows(index, ranges, page, pageSize=PAGE_SIZE):
+    # rows of page (from 0) of a selection, in the plain form of the source data
+    return expandFrame(windowRows(index, ranges, page * pageSize, (page + 1) * pageSize))
+
+
+def pageCount(ranges, pageSize=PAGE_SIZE):
+    # number of pages of a selection, at least one so an empty selection still shows its (empty) page
+    return max(-(-selectedRows(ranges) // pageSize), 1)
+
+
+def exportRows(index, ranges, path, fileFormat="csv", chunkRows=EXPORT_CHUNK):
+    # write a selection to a csv or parquet file chunk by chunk, so only one chunk is expanded at a time; the file
+    # is written under a unique name next to path and moved there when complete, so processes writing the same
+    # file at once do not mix their chunks
+    if fileFormat not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {fileFormat!r}")
+    fd, partial = tempfile.mkstemp(suffix=".partial", dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        total = selectedRows(ranges)
+        if fileFormat == "csv":
+            with open(partial, "w", newline="") as f:
+                for start in range(0, max(total, 1), chunkRows):
+                    chunk_df = expandFrame(windowRows(index, ranges, start, start + chunkRows))
+                    chunk_df.to_csv(f, header=start == 0, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            writer = None
+            try:
+                for start in range(0, max(total, 1), chunkRows):
+                    chunk_df = expandFrame(windowRows(index, ranges, start, start + chunkRows))
+                    table = pa.Table.from_pandas(chunk_df, schema=writer.schema if writer else None,
+                                                 preserve_index=False)
+                    writer = writer or pq.ParquetWriter(partial, table.schema)
+                    writer.write_table(table)
+            finally:
+                if writer:
+                    writer.close()
+    except BaseException:
+        os.remove(partial)
+        raise
+    os.replace(partial, path)
+
+    return path
@@ -0,0 +1 @@
+# regression tests of the honeybees pipeline, run with python -m pytest
@@ -0,0 +1,79 @@
+# the filled data must stay identical to the filled_colony_data.csv snapshot, and ingesting appended quarters must
+# give the same frames, cube and test facts as a full rebuild
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import honeybees as hb
+from honeybees import pipeline
+
+SNAPSHOT_FILE = os.path.join(hb.data.DATA_DIR, "filled_colony_data.csv")
+
+
+def testFilledMatchesSnapshot():
+    raw_df, regions = hb.readSources()
+    linear_df = hb.fillMissing(hb.prepareData(raw_df, regions))
+    snapshot_df = pd.read_csv(SNAPSHOT_FILE)
+
+    pd.testing.assert_frame_equal(linear_df.reset_index(drop=True), snapshot_df)
+    pd.testing.assert_frame_equal(hb.expandFrame(hb.compactFrame(linear_df)), snapshot_df)
+
+
+def sourceRows(gaps=0.0, lateState=None, firstNew=None):
+    # colony rows in period order, so every release only appends rows to the file; with a share of the values
+    # blanked out, and a state that only arrives with the quarters from firstNew on
+    raw_df = pd.read_csv(hb.data.COLONY_FILE).sort_values("period", kind="stable").reset_index(drop=True)
+    if gaps:
+        rng = np.random.default_rng(0)
+        for col in ["varroa_mites", "initial_count", "lost", "added"]:
+            raw_df.loc[rng.random(len(raw_df)) < gaps, col] = np.nan
+    if lateState:
+        raw_df = raw_df[(raw_df["state"] != lateState) | (raw_df["period"] >= firstNew)].reset_index(drop=True)
+
+    return raw_df
+
+
+def assertSameDataset(ingested, full):
+    byState = ["state", "period"]
+    pd.testing.assert_frame_equal(ingested["linear"], full["linear"])
+    pd.testing.assert_frame_equal(ingested["df"].sort_values(byState).reset_index(drop=True),
+                                  full["df"].sort_values(byState).reset_index(drop=True))
+    for grouping in hb.GROUPINGS:
+        for stat in hb.CUBE_STATS:
+            pd.testing.assert_frame_equal(ingested["cube"][grouping][stat], full["cube"][grouping][stat])
+    pd.testing.assert_frame_equal(ingested["facts"], full["facts"])
+
+
+@pytest.mark.parametrize("releases, gaps, lateState", [(1, 0.0, None), (4, 0.0, None), (4, 0.15, None),
+                                                      (2, 0.0, "Hawaii"), (2, 0.15, "Iowa")])
+def testIngestMatchesFullBuild(tmp_path, monkeypatch, releases, gaps, lateState):
+    path = str(tmp_path / "colony.csv")
+    monkeypatch.setattr(pipeline, "COLONY_FILE", path)
+    periods = sorted(pd.read_csv(hb.data.COLONY_FILE)["period"].unique())
+    raw_df = sourceRows(gaps, lateState, periods[-releases])
+
+    raw_df[raw_df["period"] < periods[-releases]].to_csv(path, index=False)
+    dataset = pipeline.buildDataset("test")
+    for period in periods[-releases:]:
+        raw_df[raw_df["period"] <= period].to_csv(path, index=False)
+        with open(path, "rb") as f:
+            assert hb.appendedRows(f.read(), dataset["source"]) is not None  # the release is ingested
+        dataset = pipeline.buildDataset("test", dataset)
+
+    assertSameDataset(dataset, pipeline.buildDataset("test"))
+
+
+def testReissuedQuarterFallsBackToFullBuild(tmp_path, monkeypatch):
+    path = str(tmp_path / "colony.csv")
+    monkeypatch.setattr(pipeline, "COLONY_FILE", path)
+    raw_df = sourceRows()
+    raw_df.to_csv(path, index=False)
+    previous = pipeline.buildDataset("test")
+
+    reissued_df = raw_df[raw_df["period"] == raw_df["period"].max()].copy()
+    reissued_df["lost"] += 1
+    pd.concat([raw_df, reissued_df]).to_csv(path, index=False)
+
+    assertSameDataset(pipeline.buildDataset("test", previous), pipeline.buildDataset("test"))